@@ -12,23 +12,73 @@ Connection options (in priority order):
 """
 
 import argparse
+import bisect
+import contextlib
+import functools
+import hashlib
+import http.client
 import ipaddress
 import json
 import os
 import re
+import socket
 import sys
+import time
+import tomllib
+import weakref
 from pathlib import Path
-from urllib.request import urlopen
+from typing import TYPE_CHECKING, Callable
 
-import snowflake.connector
+from private_file import write_private_file
+
+if TYPE_CHECKING:
+    import snowflake.connector
 
 
 SNOWFLAKE_CONFIG_DIR = Path.home() / ".snowflake"
 CONNECTIONS_TOML = SNOWFLAKE_CONFIG_DIR / "connections.toml"
 
+# Environment variables that affect how we connect
+CONFIG_ENV_VARS = (
+    "SNOWFLAKE_ACCOUNT",
+    "SNOWFLAKE_USER",
+    "SNOWFLAKE_PASSWORD",
+    "SNOWFLAKE_AUTHENTICATOR",
+    "SNOWFLAKE_DEFAULT_CONNECTION_NAME",
+    "SNOWFLAKE_CONNECTION_NAME",
+)
+
+# On-disk DESCRIBE NETWORK POLICY cache (opt-in via --cache-ttl)
+POLICY_CACHE_DIR = Path.home() / ".cache" / "snowflake-netpol"
+
+# Public IP lookup services, tried in order: (host, path)
+IP_LOOKUP_SERVICES = [
+    ("ifconfig.me", "/ip"),
+    ("api.ipify.org", "/"),
+]
+
+# Keep-alive HTTPS connections per lookup host, reused across calls
+_ip_lookup_connections: dict[str, http.client.HTTPSConnection] = {}
+
+# DESCRIBE NETWORK POLICY results per open connection: {conn: {policy_name: policy}}
+_policy_cache: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+# Text-mode icon per check status
+_STATUS_ICONS = {
+    "ALLOWED": "✅",
+    "BLOCKED": "❌",
+    "NOT_ALLOWED": "⚠️",
+}
+
+# DESCRIBE NETWORK POLICY properties used by the check
+_DESCRIBE_POLICY_FIELDS = {"name", "allowed_ip_list", "blocked_ip_list"}
+
 # Valid unquoted Snowflake identifier pattern
 _UNQUOTED_IDENTIFIER_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_$]*$')
 
+# Statement terminators and comment markers never allowed in an identifier
+_PROHIBITED_TOKENS_RE = re.compile(r';|--|/\*|\*/')
+
 
 def quote_identifier(name: str) -> str:
     """
@@ -41,7 +91,7 @@ def quote_identifier(name: str) -> str:
         raise ValueError("Identifier cannot be empty")
     
     # Check for obviously malicious content
-    if any(c in name for c in [';', '--', '/*', '*/']):
+    if _PROHIBITED_TOKENS_RE.search(name):
         raise ValueError(f"Invalid identifier: contains prohibited characters")
     
     # If it's a valid unquoted identifier, return as-is
@@ -53,87 +103,201 @@ def quote_identifier(name: str) -> str:
     return f'"{escaped}"'
 
 
-def get_public_ip() -> str:
-    """Fetch current public IP. Tries ifconfig.me first, falls back to ipify."""
-    # Try ifconfig.me first
+def _http_get_text(host: str, path: str, timeout: float = 5) -> str:
+    """GET a plain-text body over a pooled keep-alive HTTPS connection."""
+    conn = _ip_lookup_connections.get(host)
+    if conn is None:
+        conn = http.client.HTTPSConnection(host, timeout=timeout)
+        _ip_lookup_connections[host] = conn
+    
     try:
-        with urlopen("https://ifconfig.me", timeout=5) as response:
-            return response.read().decode("utf-8").strip()
-    except Exception:
-        pass
+        conn.request("GET", path, headers={"Accept": "text/plain"})
+        response = conn.getresponse()
+        body = response.read()
+    except (http.client.HTTPException, OSError):
+        # Drop the broken socket; the next request reconnects automatically
+        conn.close()
+        raise
     
-    # Fall back to ipify
+    if response.status != 200:
+        raise RuntimeError(f"{host} returned HTTP {response.status}")
+    return body.decode("utf-8").strip()
+
+
+def get_public_ip() -> str:
+    """Fetch current public IP. Tries ifconfig.me first, falls back to ipify."""
+    last_error = None
+    for host, path in IP_LOOKUP_SERVICES:
+        try:
+            return _http_get_text(host, path)
+        except Exception as e:
+            last_error = e
+    raise RuntimeError(f"Failed to get public IP: {last_error}")
+
+
+def _parse_ipv4(ip: str) -> int | None:
+    """Parse a dotted-quad IPv4 address to an int, or None if it isn't one."""
     try:
-        with urlopen("https://api.ipify.org", timeout=5) as response:
-            return response.read().decode("utf-8").strip()
-    except Exception as e:
-        raise RuntimeError(f"Failed to get public IP: {e}")
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except OSError:
+        return None
 
 
-def ip_in_cidr_list(ip: str, cidr_list: list[str]) -> bool:
-    """Check if an IP address falls within any CIDR range in the list."""
+def _parse_cidr_range(cidr: str) -> tuple[int, int, int] | None:
+    """
+    Parse a CIDR (or bare address) to (version, first, last) address ints.
+    
+    IPv4 with a numeric prefix uses plain integer math; IPv6 and netmask-style
+    prefixes fall back to the ipaddress module. Returns None if invalid.
+    """
+    address, slash, prefix = cidr.partition("/")
+    # A bare address is a /32; a trailing "/" with no prefix is invalid
+    if not slash or (prefix.isascii() and prefix.isdigit() and int(prefix) <= 32):
+        ip_int = _parse_ipv4(address)
+        if ip_int is not None:
+            bits = int(prefix) if slash else 32
+            host_mask = 0xFFFFFFFF >> bits
+            first = ip_int & ~host_mask
+            return 4, first, first | host_mask
+    
     try:
-        ip_obj = ipaddress.ip_address(ip)
+        network = ipaddress.ip_network(cidr, strict=False)
     except ValueError:
-        return False
+        return None
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
 
-    for cidr in cidr_list:
+@functools.lru_cache(maxsize=32)
+def _compile_cidr_list(cidrs: tuple[str, ...]) -> dict[int, tuple[list[int], list[int]]]:
+    """
+    Pre-compute sorted range bounds for a CIDR list, per address family.
+    
+    Returns {version: (starts, ends)} with parallel lists of first/last
+    addresses as integers. Adjacent and overlapping ranges are merged first,
+    so the ranges are disjoint and sorted, which lets lookups use bisect.
+    Cached per list, so a policy's ranges are parsed once.
+    """
+    ranges = {4: [], 6: []}
+    for cidr in cidrs:
         cidr = cidr.strip().strip("'\"")
         if not cidr:
             continue
+        parsed = _parse_cidr_range(cidr)
+        if parsed:
+            version, first, last = parsed
+            ranges[version].append((first, last))
+    
+    compiled = {}
+    for version, family in ranges.items():
+        starts, ends = [], []
+        for first, last in sorted(family):
+            if ends and first <= ends[-1] + 1:
+                # Adjacent or overlapping: extend the previous range
+                ends[-1] = max(ends[-1], last)
+            else:
+                starts.append(first)
+                ends.append(last)
+        if starts:
+            compiled[version] = (starts, ends)
+    return compiled
+
+
+def _ip_in_ranges(ip: str, compiled: dict[int, tuple[list[int], list[int]]]) -> bool:
+    """Check an IP against ranges produced by _compile_cidr_list."""
+    version, ip_int = 4, _parse_ipv4(ip)
+    if ip_int is None:
         try:
-            if "/" not in cidr:
-                cidr = f"{cidr}/32"
-            network = ipaddress.ip_network(cidr, strict=False)
-            if ip_obj in network:
-                return True
+            ip_obj = ipaddress.ip_address(ip)
         except ValueError:
-            continue
-    return False
+            return False
+        version, ip_int = ip_obj.version, int(ip_obj)
 
+    ranges = compiled.get(version)
+    if not ranges:
+        return False
+    
+    starts, ends = ranges
+    # Last range starting at or before the IP is the only candidate
+    i = bisect.bisect_right(starts, ip_int) - 1
+    return i >= 0 and ip_int <= ends[i]
 
-def check_connection_config() -> dict:
+
+def ip_in_cidr_list(ip: str, cidr_list: list[str]) -> bool:
+    """Check if an IP address falls within any CIDR range in the list."""
+    return _ip_in_ranges(ip, _compile_cidr_list(tuple(cidr_list)))
+
+
+def cidr_matcher(cidr_list: list[str]) -> Callable[[str], bool]:
     """
-    Check what Snowflake connection options are available.
+    Return a predicate bound to one CIDR list's precompiled ranges.
     
-    Returns dict with: has_toml, has_env, toml_path, connections
+    Use when checking many IPs against the same policy: it skips the per-call
+    cache lookup (hashing the whole list) that ip_in_cidr_list does.
     """
+    return functools.partial(_ip_in_ranges, compiled=_compile_cidr_list(tuple(cidr_list)))
+
+
+@functools.lru_cache(maxsize=4)
+def _load_toml(path_str: str, mtime_ns: int) -> dict:
+    """Parse a TOML file. Cached per (path, mtime) so unchanged files parse once."""
+    with open(path_str, "rb") as f:
+        return tomllib.load(f)
+
+
+@functools.lru_cache(maxsize=1)
+def _check_connection_config(
+    toml_path: str, toml_mtime_ns: int | None, env_vars: tuple[tuple[str, str | None], ...]
+) -> dict:
+    """Build the connection config report for a given toml state and environment."""
     result = {
         "has_toml": False,
         "has_env": False,
-        "toml_path": str(CONNECTIONS_TOML),
+        "toml_path": toml_path,
         "connections": [],
         "env_vars": {},
     }
     
     # Check for connections.toml
-    if CONNECTIONS_TOML.exists():
+    if toml_mtime_ns is not None:
         result["has_toml"] = True
         try:
             # Parse toml to list connection names
-            import tomllib
-            with open(CONNECTIONS_TOML, "rb") as f:
-                config = tomllib.load(f)
-                result["connections"] = list(config.keys())
+            result["connections"] = list(_load_toml(toml_path, toml_mtime_ns).keys())
         except Exception:
             # If we can't parse, just note it exists
             pass
     
     # Check for environment variables
-    env_vars = {
-        "SNOWFLAKE_ACCOUNT": os.environ.get("SNOWFLAKE_ACCOUNT"),
-        "SNOWFLAKE_USER": os.environ.get("SNOWFLAKE_USER"),
-        "SNOWFLAKE_PASSWORD": os.environ.get("SNOWFLAKE_PASSWORD"),
-        "SNOWFLAKE_AUTHENTICATOR": os.environ.get("SNOWFLAKE_AUTHENTICATOR"),
-        "SNOWFLAKE_DEFAULT_CONNECTION_NAME": os.environ.get("SNOWFLAKE_DEFAULT_CONNECTION_NAME"),
-        "SNOWFLAKE_CONNECTION_NAME": os.environ.get("SNOWFLAKE_CONNECTION_NAME"),
-    }
-    result["env_vars"] = {k: v for k, v in env_vars.items() if v}
+    result["env_vars"] = {k: v for k, v in env_vars if v}
     result["has_env"] = bool(result["env_vars"].get("SNOWFLAKE_ACCOUNT"))
     
     return result
 
 
+def check_connection_config() -> dict:
+    """
+    Check what Snowflake connection options are available.
+    
+    Returns dict with: has_toml, has_env, toml_path, connections
+    
+    Memoized on the relevant environment variables and the toml's mtime, so
+    repeat calls are cheap until either changes; each call gets its own copy.
+    Use clear_connection_config_cache() to force a re-check.
+    """
+    try:
+        toml_mtime_ns = CONNECTIONS_TOML.stat().st_mtime_ns
+    except FileNotFoundError:
+        toml_mtime_ns = None
+    env_vars = tuple((k, os.environ.get(k)) for k in CONFIG_ENV_VARS)
+    result = _check_connection_config(str(CONNECTIONS_TOML), toml_mtime_ns, env_vars)
+    return {**result, "connections": list(result["connections"]), "env_vars": dict(result["env_vars"])}
+
+
+def clear_connection_config_cache() -> None:
+    """Forget the memoized check_connection_config() result."""
+    _check_connection_config.cache_clear()
+
+
 def print_connection_help(config: dict) -> None:
     """Print helpful guidance on setting up Snowflake connection."""
     print("\n❌ No Snowflake connection configuration found.\n")
@@ -171,7 +335,7 @@ def get_connection(
     user: str | None = None,
     password: str | None = None,
     authenticator: str | None = None,
-) -> snowflake.connector.SnowflakeConnection:
+) -> "snowflake.connector.SnowflakeConnection":
     """
     Get a Snowflake connection using available configuration.
     
@@ -180,6 +344,9 @@ def get_connection(
     2. Environment variables
     3. Connection name from ~/.snowflake/connections.toml
     """
+    # Imported here so --help and --check-config don't pay the connector's startup cost
+    import snowflake.connector
+    
     # Option 1: Direct connection params
     if account and user:
         connect_args = {
@@ -228,39 +395,129 @@ def get_connection(
     return snowflake.connector.connect(connection_name=name)
 
 
+@contextlib.contextmanager
+def snowflake_session(
+    connection_name: str | None = None,
+    account: str | None = None,
+    user: str | None = None,
+    password: str | None = None,
+    authenticator: str | None = None,
+):
+    """
+    Open one Snowflake connection for a batch of checks and close it on exit.
+    
+    Pass the yielded connection as `conn=` to check_ip_against_policy.
+    """
+    conn = get_connection(connection_name, account, user, password, authenticator)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
 def parse_ip_list(value: str) -> list[str]:
     """Parse an IP list from Snowflake DESCRIBE output."""
-    if not value or value.lower() in ("null", "none", ""):
+    value = value.strip() if value else ""
+    if value.lower() in ("null", "none", ""):
         return []
     
-    value = value.strip("[]")
-    pattern = r"['\"]?(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}(?:/\d{1,2})?)['\"]?"
-    matches = re.findall(pattern, value)
-    return matches
+    ips = []
+    for item in value.strip("[]").split(","):
+        item = item.strip().strip("'\"").strip()
+        if not item:
+            continue
+        if _parse_cidr_range(item) is not None:
+            ips.append(item)
+    return ips
 
 
-def get_network_policy(conn: snowflake.connector.SnowflakeConnection, policy_name: str) -> dict:
-    """Fetch network policy details from Snowflake."""
+def _describe_network_policy(cur, policy_name: str) -> dict:
+    """Run DESCRIBE NETWORK POLICY on an open cursor and parse the rows."""
     safe_name = quote_identifier(policy_name)
-    query = f"DESCRIBE NETWORK POLICY {safe_name}"
+    cur.execute(f"DESCRIBE NETWORK POLICY {safe_name}")
     
     policy = {}
-    with conn.cursor() as cur:
-        cur.execute(query)
-        for row in cur:
-            name = row[0].lower() if row[0] else ""
-            value = row[1] if len(row) > 1 else ""
-            
-            if name == "allowed_ip_list":
-                policy["allowed_ip_list"] = parse_ip_list(str(value))
-            elif name == "blocked_ip_list":
-                policy["blocked_ip_list"] = parse_ip_list(str(value))
-            elif name == "name":
-                policy["name"] = value
+    for row in cur:
+        name = row[0].lower() if row[0] else ""
+        value = row[1] if len(row) > 1 else ""
+        
+        if name == "allowed_ip_list":
+            policy["allowed_ip_list"] = parse_ip_list(str(value))
+        elif name == "blocked_ip_list":
+            policy["blocked_ip_list"] = parse_ip_list(str(value))
+        elif name == "name":
+            policy["name"] = value
+        
+        # Stop reading once every field we use has been seen
+        if _DESCRIBE_POLICY_FIELDS <= policy.keys():
+            break
     
     return policy
 
 
+def get_network_policies(
+    conn: "snowflake.connector.SnowflakeConnection", policy_names: list[str]
+) -> dict[str, dict]:
+    """
+    Fetch details for several network policies over a single cursor.
+    
+    Results are cached for the lifetime of the connection, so repeated checks
+    against the same policy don't issue another DESCRIBE. (SHOW NETWORK POLICIES
+    only reports entry counts, so each policy still needs its own DESCRIBE.)
+    """
+    cache = _policy_cache.setdefault(conn, {})
+    missing = [name for name in policy_names if name not in cache]
+    if missing:
+        with conn.cursor() as cur:
+            for name in missing:
+                cache[name] = _describe_network_policy(cur, name)
+    return {name: cache[name] for name in policy_names}
+
+
+def get_network_policy(conn: "snowflake.connector.SnowflakeConnection", policy_name: str) -> dict:
+    """Fetch network policy details from Snowflake."""
+    return get_network_policies(conn, [policy_name])[policy_name]
+
+
+def _policy_cache_path(
+    policy_name: str,
+    connection_name: str | None = None,
+    account: str | None = None,
+) -> Path:
+    """Cache file for a policy, keyed by the account/connection it was read from."""
+    source = (
+        account
+        or os.environ.get("SNOWFLAKE_ACCOUNT")
+        or connection_name
+        or os.environ.get("SNOWFLAKE_DEFAULT_CONNECTION_NAME")
+        or os.environ.get("SNOWFLAKE_CONNECTION_NAME")
+        or "default"
+    )
+    digest = hashlib.sha256(f"{source}\0{policy_name}".encode()).hexdigest()[:16]
+    return POLICY_CACHE_DIR / f"{digest}.json"
+
+
+def read_cached_policy(cache_path: Path, ttl: float) -> dict | None:
+    """Return a cached policy if the cache file is younger than `ttl` seconds."""
+    try:
+        if time.time() - cache_path.stat().st_mtime >= ttl:
+            return None
+        policy = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        # Missing, unreadable or corrupt (JSONDecodeError/UnicodeDecodeError): refetch
+        return None
+    return policy if isinstance(policy, dict) else None
+
+
+def write_cached_policy(cache_path: Path, policy: dict) -> None:
+    """Write a policy to the on-disk cache. Failures are ignored."""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_private_file(cache_path, json.dumps(policy))
+    except OSError:
+        pass
+
+
 def check_ip_against_policy(
     ip: str, 
     policy_name: str, 
@@ -269,19 +526,42 @@ def check_ip_against_policy(
     user: str | None = None,
     password: str | None = None,
     authenticator: str | None = None,
+    conn: "snowflake.connector.SnowflakeConnection | None" = None,
+    cache_ttl: float = 0,
+    refresh_cache: bool = False,
 ) -> dict:
-    """Check if an IP address is allowed by a network policy."""
-    conn = get_connection(connection_name, account, user, password, authenticator)
-    try:
-        policy = get_network_policy(conn, policy_name)
-    finally:
-        conn.close()
+    """
+    Check if an IP address is allowed by a network policy.
+    
+    If `conn` is given it is reused (and left open); otherwise a connection is
+    opened for this call and closed afterwards.
+    
+    With `cache_ttl` > 0, policy details are read from (and saved to) an on-disk
+    cache under ~/.cache/snowflake-netpol, skipping Snowflake entirely on a hit.
+    `refresh_cache` ignores any cached entry and re-fetches it.
+    """
+    policy = None
+    cache_path = None
+    if cache_ttl > 0:
+        cache_path = _policy_cache_path(policy_name, connection_name, account)
+        if not refresh_cache:
+            policy = read_cached_policy(cache_path, cache_ttl)
+    
+    if policy is None:
+        if conn is not None:
+            policy = get_network_policy(conn, policy_name)
+        else:
+            with snowflake_session(connection_name, account, user, password, authenticator) as session:
+                policy = get_network_policy(session, policy_name)
+        if cache_path is not None:
+            write_cached_policy(cache_path, policy)
     
     allowed_list = policy.get("allowed_ip_list", [])
     blocked_list = policy.get("blocked_ip_list", [])
     
-    is_in_allowed = ip_in_cidr_list(ip, allowed_list)
+    # Blocked takes precedence, so only scan the (usually larger) allowed list if needed
     is_in_blocked = ip_in_cidr_list(ip, blocked_list)
+    is_in_allowed = False if is_in_blocked else ip_in_cidr_list(ip, allowed_list)
     
     result = {
         "ip": ip,
@@ -308,7 +588,29 @@ def check_ip_against_policy(
     return result
 
 
-def main():
+def print_config_check() -> None:
+    """Print the available Snowflake connection options (--check-config)."""
+    config = check_connection_config()
+    print("Snowflake Connection Configuration\n")
+    print(f"Config file: {config['toml_path']}")
+    print(f"  Exists: {'✅' if config['has_toml'] else '❌'}")
+    if config['connections']:
+        print(f"  Connections: {', '.join(config['connections'])}")
+    print(f"\nEnvironment variables:")
+    if config['env_vars']:
+        for k, v in config['env_vars'].items():
+            # Mask password
+            display = "****" if "PASSWORD" in k else v
+            print(f"  {k}={display}")
+    else:
+        print("  (none set)")
+    print(f"\nReady to connect: {'✅' if config['has_toml'] or config['has_env'] else '❌'}")
+    if not config['has_toml'] and not config['has_env']:
+        print_connection_help(config)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the CLI argument parser."""
     parser = argparse.ArgumentParser(
         description="Check if your IP is allowed by a Snowflake network policy",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -330,6 +632,9 @@ Examples:
 
   # Using SSO
   %(prog)s -p my_policy --account myorg-myaccount --user myuser --authenticator externalbrowser
+
+  # Reuse policy details for 5 minutes across repeated checks (e.g. CI loops)
+  %(prog)s -p my_policy --cache-ttl 300
 """
     )
     parser.add_argument(
@@ -371,33 +676,41 @@ Examples:
         action="store_true",
         help="Output as JSON"
     )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help="Reuse policy details cached on disk for this many seconds (default: 0, no caching)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore any cached policy details and refresh them"
+    )
     parser.add_argument(
         "--check-config",
         action="store_true",
-        help="Check available connection options and exit"
+        help="Check available connection options and exit (no --policy-name needed)"
     )
     
-    args = parser.parse_args()
+    return parser
+
+
+def main(argv: list[str] | None = None):
+    if argv is None:
+        argv = sys.argv[1:]
     
-    # Check config mode
+    # Check config mode needs no policy, Snowflake connection or parser; other
+    # options don't affect it, so it is answered before argparse is built
+    if "--check-config" in argv and not {"-h", "--help"} & set(argv):
+        print_config_check()
+        sys.exit(0)
+    
+    args = build_parser().parse_args(argv)
+    # An abbreviation such as --check misses the fast path above
     if args.check_config:
-        config = check_connection_config()
-        print("Snowflake Connection Configuration\n")
-        print(f"Config file: {config['toml_path']}")
-        print(f"  Exists: {'✅' if config['has_toml'] else '❌'}")
-        if config['connections']:
-            print(f"  Connections: {', '.join(config['connections'])}")
-        print(f"\nEnvironment variables:")
-        if config['env_vars']:
-            for k, v in config['env_vars'].items():
-                # Mask password
-                display = "****" if "PASSWORD" in k else v
-                print(f"  {k}={display}")
-        else:
-            print("  (none set)")
-        print(f"\nReady to connect: {'✅' if config['has_toml'] or config['has_env'] else '❌'}")
-        if not config['has_toml'] and not config['has_env']:
-            print_connection_help(config)
+        print_config_check()
         sys.exit(0)
     
     try:
@@ -413,16 +726,14 @@ Examples:
             args.user,
             args.password,
             args.authenticator,
+            cache_ttl=args.cache_ttl,
+            refresh_cache=args.no_cache,
         )
         
         if args.json:
             print(json.dumps(result, indent=2))
         else:
-            status_icon = {
-                "ALLOWED": "✅",
-                "BLOCKED": "❌",
-                "NOT_ALLOWED": "⚠️"
-            }.get(result["status"], "❓")
+            status_icon = _STATUS_ICONS.get(result["status"], "❓")
             
             print(f"{status_icon} {result['message']}")
             print(f"\n  Policy: {result['policy_name']}")
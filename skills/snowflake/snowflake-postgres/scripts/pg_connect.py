@@ -13,22 +13,45 @@ Credentials are never logged to console.
 """
 
 import argparse
-import configparser
+import functools
 import json
 import os
+import re
 import sys
 import tomllib
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING
 from urllib.parse import parse_qs, unquote, urlparse
 
 import psycopg2
-import snowflake.connector
-from cryptography.hazmat.primitives import serialization
+
+from private_file import write_private_file
+
+# The Snowflake connector and cryptography are only needed for --create and
+# --reset; they are imported on first use to keep other commands fast
+if TYPE_CHECKING:
+    import snowflake.connector
+
+# Optional: faster JSON parsing/serialization (falls back to stdlib json)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: faster TOML parsing for Snowflake config files (falls back to tomllib)
+try:
+    import rtoml
+except ImportError:
+    rtoml = None
 
 # Standard PostgreSQL config files
 PG_SERVICE_FILE = Path.home() / ".pg_service.conf"
 PGPASS_FILE = Path.home() / ".pgpass"
 
+# Where raw CREATE/RESET responses are kept for debugging/recovery
+RECOVERY_DIR = Path("/tmp")
+
 # Snowflake CLI config paths (for --create and --reset to connect to Snowflake)
 # These are standard Snowflake CLI locations - the script reads them directly
 # when executed standalone (not through the agent's SQL tool)
@@ -37,12 +60,114 @@ _SF_CONNECTIONS_TOML = _SF_CONFIG_DIR / "connections.toml"
 _SF_CONFIG_TOML = _SF_CONFIG_DIR / "config.toml"
 _SF_AGENT_SETTINGS = _SF_CONFIG_DIR / "cortex" / "settings.json"
 
+# Connection error categories: (lowercase substrings, message), checked in
+# priority order - the first category with any matching substring wins
+_CONNECTION_ERROR_CATEGORIES = (
+    (
+        ("connection refused", "could not connect"),
+        "Connection refused. Possible causes:\n"
+        "  • Your IP may not be in the network policy allow list\n"
+        "  • The Postgres instance may be suspended\n"
+        "  • Firewall blocking port 5432\n"
+        "  Run: network_policy_check.py to verify your IP is allowed",
+    ),
+    (
+        ("timeout", "timed out"),
+        "Connection timed out. Possible causes:\n"
+        "  • Network connectivity issues\n"
+        "  • Firewall blocking the connection\n"
+        "  • Instance may be starting up",
+    ),
+    (
+        ("authentication failed", "password"),
+        "Authentication failed. Possible causes:\n"
+        "  • Incorrect username or password\n"
+        "  • Password may need URL encoding for special characters\n"
+        "  • User may not exist on this instance",
+    ),
+    (
+        ("ssl",),
+        "SSL error. Ensure your connection string includes:\n"
+        "  ?sslmode=require",
+    ),
+    (
+        ("does not exist",),
+        "Database '{database}' not found.\n"
+        "  • Check the database name\n"
+        "  • Default database is usually 'postgres'",
+    ),
+)
+
+# Fast path for plain ASCII connection strings. Anything it doesn't match
+# (IPv6 brackets, '@' in the password, unusual hosts) goes through urlparse
+_CONNECTION_STRING_RE = re.compile(
+    r"(?i:postgres(?:ql)?)://"
+    r"(?:(?P<user>[^:@/?#\[\]]*)(?::(?P<password>[^@/?#\[\]]*))?@)?"
+    r"(?P<host>[A-Za-z0-9.-]*)"
+    r"(?::(?P<port>[0-9]{1,5}))?"
+    r"(?P<path>/[^?#]*)?"
+    r"(?:\?(?P<query>[^#]*))?"
+    r"(?:#.*)?"
+)
+
+# Template/documentation hostnames that can't be a real instance host
+_PLACEHOLDER_HOST_RE = re.compile(
+    r"(?:www\.)?example\.(?:com|org|net)|<[^>]*>|"
+    r"(?:your[-_]?)?(?:host|hostname)(?:[-_]?here)?|changeme|placeholder",
+    re.IGNORECASE,
+)
+
+# Parsed service/pgpass files, reused while (path, mtime, size) is unchanged
+_service_cache: dict = {"key": None, "config": None, "entries": {}}
+_pgpass_cache: dict = {"key": None, "entries": None, "index": None, "wildcards": None}
+_EMPTY_PGPASS: tuple[list[dict], dict, list[int]] = ([], {}, [])
+
+# Connection fields that must never appear in CLI output
+_SECRET_FIELDS = frozenset(("password", "access_roles"))
+
 _SF_ALLOWED_CONFIG_KEYS = {
     "account", "user", "password", "authenticator",
     "private_key_path", "private_key_passphrase",
     "host", "database", "schema", "warehouse", "role",
 }
 
+# CREATE POSTGRES INSTANCE statement; optional clauses are appended, in this
+# order, for each argument that is set (not None)
+_CREATE_INSTANCE_SQL = (
+    "CREATE POSTGRES INSTANCE {instance_name}\n"
+    "  COMPUTE_FAMILY = '{compute_pool}'\n"
+    "  STORAGE_SIZE_GB = {storage}\n"
+    "  AUTHENTICATION_AUTHORITY = POSTGRES{optional_sql};"
+)
+_CREATE_INSTANCE_OPTIONS = (
+    ("auto_suspend_secs", "\n  AUTO_SUSPEND_SECS = {}"),
+    ("enable_ha", "\n  HIGH_AVAILABILITY = TRUE"),
+    ("postgres_version", "\n  POSTGRES_VERSION = '{}'"),
+    ("network_policy", "\n  NETWORK_POLICY = '{}'"),
+)
+
+
+def _json_loads(data: str | bytes) -> object:
+    """Parse JSON, using orjson when installed.
+    
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can
+    catch the stdlib exception either way.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps_indented(payload: object) -> str:
+    """Serialize JSON with 2-space indentation, using orjson when installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, option=orjson.OPT_INDENT_2).decode()
+        except TypeError:
+            # Types orjson rejects (e.g. Decimal) get stdlib behavior
+            pass
+    return json.dumps(payload, indent=2)
+
 
 def _row_to_dict(columns: list, row: list | tuple) -> dict:
     """Convert a SQL result row to a dict using column names."""
@@ -51,16 +176,9 @@ def _row_to_dict(columns: list, row: list | tuple) -> dict:
 
 def parse_create_response(response_file: str) -> dict:
     """
-    Extract connection params from CREATE POSTGRES INSTANCE JSON response.
-    
-    Handles two formats:
-    1. Direct dict: {"host": "...", "access_roles": [...]}
-    2. SQL result: {"columns": [...], "rows": [[...]]}
+    Extract connection params from a saved CREATE POSTGRES INSTANCE JSON response.
     
-    Returns dict with:
-    - host, port, database, sslmode (connection info)
-    - user, password (primary user - snowflake_admin)
-    - access_roles: list of {"name": str, "password": str} for all roles
+    See parse_create_response_data for the accepted formats and result.
     """
     if not Path(response_file).exists():
         raise FileNotFoundError(
@@ -70,9 +188,22 @@ def parse_create_response(response_file: str) -> dict:
             "  • Manually add your connection to ~/.pg_service.conf and password to ~/.pgpass"
         )
     
-    with open(response_file) as f:
-        data = json.load(f)
+    return parse_create_response_data(_json_loads(Path(response_file).read_bytes()))
+
+
+def parse_create_response_data(data: object) -> dict:
+    """
+    Extract connection params from a CREATE POSTGRES INSTANCE response.
+    
+    Handles two formats:
+    1. Direct dict: {"host": "...", "access_roles": [...]}
+    2. SQL result: {"columns": [...], "rows": [[...]]}
     
+    Returns dict with:
+    - host, port, database, sslmode (connection info)
+    - user, password (primary user - snowflake_admin)
+    - access_roles: list of {"name": str, "password": str} for all roles
+    """
     # Handle list wrapper
     if isinstance(data, list) and len(data) > 0:
         data = data[0]
@@ -93,7 +224,7 @@ def parse_create_response(response_file: str) -> dict:
     access_roles = data.get("access_roles", [])
     if isinstance(access_roles, str):
         try:
-            access_roles = json.loads(access_roles)
+            access_roles = _json_loads(access_roles)
         except json.JSONDecodeError:
             access_roles = []
     
@@ -162,10 +293,12 @@ def _extract_password(payload: object) -> str | None:
             columns = payload["columns"]
             rows = payload["rows"]
             if isinstance(columns, list) and isinstance(rows, list) and rows:
-                # Find password column index (case-insensitive)
-                col_lower = [c.lower() if isinstance(c, str) else c for c in columns]
-                if "password" in col_lower:
-                    pwd_idx = col_lower.index("password")
+                # Find password column index (case-insensitive), stopping at the first match
+                pwd_idx = next(
+                    (i for i, c in enumerate(columns) if isinstance(c, str) and c.lower() == "password"),
+                    -1,
+                )
+                if pwd_idx >= 0:
                     first_row = rows[0]
                     if isinstance(first_row, (list, tuple)) and len(first_row) > pwd_idx:
                         return first_row[pwd_idx]
@@ -188,9 +321,13 @@ def parse_reset_response(response_file: str) -> str:
             "  • Manually update your password in ~/.pgpass"
         )
     
-    with open(response_file) as f:
-        data = json.load(f)
+    return parse_reset_response_data(_json_loads(Path(response_file).read_bytes()))
 
+
+def parse_reset_response_data(data: object) -> str:
+    """
+    Extract password from a RESET ACCESS response.
+    """
     password = _extract_password(data)
     if not password:
         raise ValueError("No password field found in reset response")
@@ -198,28 +335,54 @@ def parse_reset_response(response_file: str) -> str:
     return password
 
 
-def parse_connection_string(conn_str: str) -> dict:
-    """
-    Parse a postgres:// connection string into components.
+@functools.lru_cache(maxsize=16)
+def _parse_connection_string_cached(conn_str: str) -> tuple[tuple[str, object], ...]:
+    """Parse a connection string into (key, value) pairs. Cached per string.
     
-    Returns dict with: host, port, database, user, password, sslmode
+    Common strings are split by one precompiled regex; everything else falls
+    back to urlparse, and both paths give the same result.
     """
-    parsed = urlparse(conn_str)
+    match = None
+    if conn_str.isascii() and conn_str.isprintable():
+        match = _CONNECTION_STRING_RE.fullmatch(conn_str)
     
-    if parsed.scheme not in ("postgres", "postgresql"):
-        raise ValueError(f"Invalid scheme: {parsed.scheme}. Expected postgres:// or postgresql://")
+    if match is not None and (match["port"] is None or int(match["port"]) <= 65535):
+        user, password, host, port, path, query = match.group(
+            "user", "password", "host", "port", "path", "query",
+        )
+        host = host.lower()
+        port = int(port) if port else None
+    else:
+        parsed = urlparse(conn_str)
+        if parsed.scheme not in ("postgres", "postgresql"):
+            raise ValueError(f"Invalid scheme: {parsed.scheme}. Expected postgres:// or postgresql://")
+        user, password, host, port, path, query = (
+            parsed.username, parsed.password, parsed.hostname, parsed.port, parsed.path, parsed.query,
+        )
     
     # Extract query params (like sslmode)
-    query_params = parse_qs(parsed.query)
+    query_params = parse_qs(query) if query else {}
     
-    return {
-        "host": parsed.hostname,
-        "port": parsed.port or 5432,
-        "database": (parsed.path.lstrip("/") or None) if parsed.path else None,
-        "user": parsed.username,
-        "password": unquote(parsed.password) if parsed.password else None,
-        "sslmode": query_params.get("sslmode", ["require"])[0],
-    }
+    return (
+        ("host", host or None),
+        ("port", port or 5432),
+        ("database", (path.lstrip("/") or None) if path else None),
+        ("user", user),
+        ("password", unquote(password) if password else None),
+        ("sslmode", query_params.get("sslmode", ["require"])[0]),
+    )
+
+
+def parse_connection_string(conn_str: str) -> dict:
+    """
+    Parse a postgres:// connection string into components.
+    
+    Returns dict with: host, port, database, user, password, sslmode
+    
+    Results are memoized per string. The cache key includes the password, so
+    the cache is kept small; each call still returns a fresh dict.
+    """
+    return dict(_parse_connection_string_cached(conn_str))
 
 
 def build_connection_string(params: dict) -> str:
@@ -238,10 +401,16 @@ def build_connection_string(params: dict) -> str:
 def sanitize_error(error_msg: str, params: dict) -> str:
     """Remove any credentials from error messages."""
     msg = str(error_msg)
-    if params.get("password"):
-        msg = msg.replace(params["password"], "[REDACTED]")
-    if params.get("user"):
-        msg = msg.replace(f"user={params['user']}", "user=[REDACTED]")
+    # Most errors (timeouts, DNS failures) carry no credentials; a substring
+    # test is cheaper than a replace that finds nothing and copies the string
+    password = params.get("password")
+    if password and password in msg:
+        msg = msg.replace(password, "[REDACTED]")
+    user = params.get("user")
+    if user:
+        user_field = f"user={user}"
+        if user_field in msg:
+            msg = msg.replace(user_field, "user=[REDACTED]")
     return msg
 
 
@@ -249,41 +418,27 @@ def categorize_connection_error(error: Exception, params: dict) -> str:
     """Provide helpful error messages for common connection issues."""
     error_str = str(error).lower()
     
-    if "connection refused" in error_str or "could not connect" in error_str:
-        return (
-            "Connection refused. Possible causes:\n"
-            "  • Your IP may not be in the network policy allow list\n"
-            "  • The Postgres instance may be suspended\n"
-            "  • Firewall blocking port 5432\n"
-            "  Run: network_policy_check.py to verify your IP is allowed"
-        )
-    elif "timeout" in error_str or "timed out" in error_str:
-        return (
-            "Connection timed out. Possible causes:\n"
-            "  • Network connectivity issues\n"
-            "  • Firewall blocking the connection\n"
-            "  • Instance may be starting up"
-        )
-    elif "authentication failed" in error_str or "password" in error_str:
-        return (
-            "Authentication failed. Possible causes:\n"
-            "  • Incorrect username or password\n"
-            "  • Password may need URL encoding for special characters\n"
-            "  • User may not exist on this instance"
-        )
-    elif "ssl" in error_str:
-        return (
-            "SSL error. Ensure your connection string includes:\n"
-            "  ?sslmode=require"
-        )
-    elif "does not exist" in error_str:
-        return (
-            f"Database '{params.get('database')}' not found.\n"
-            "  • Check the database name\n"
-            "  • Default database is usually 'postgres'"
-        )
-    else:
-        return f"Connection failed: {sanitize_error(error, params)}"
+    for needles, message in _CONNECTION_ERROR_CATEGORIES:
+        if any(needle in error_str for needle in needles):
+            return message.format(database=params.get("database"))
+    return f"Connection failed: {sanitize_error(error, params)}"
+
+
+@functools.lru_cache(maxsize=8)
+def _make_validation_dsn(host: str, port: int, database: str, user: str, password: str, sslmode: str) -> str:
+    """Build the libpq DSN used by validate_connection, reused across retries.
+    
+    Kept small since each entry holds a password for the life of the process.
+    """
+    return psycopg2.extensions.make_dsn(
+        host=host,
+        port=port,
+        dbname=database,
+        user=user,
+        password=password,
+        sslmode=sslmode,
+        connect_timeout=10,
+    )
 
 
 def validate_connection(params: dict) -> tuple[bool, str]:
@@ -293,15 +448,15 @@ def validate_connection(params: dict) -> tuple[bool, str]:
     Returns (success, message). Never exposes credentials in error messages.
     """
     try:
-        conn = psycopg2.connect(
-            host=params["host"],
-            port=params["port"],
-            database=params["database"],
-            user=params["user"],
-            password=params["password"],
-            sslmode=params.get("sslmode", "require"),
-            connect_timeout=10,
+        dsn = _make_validation_dsn(
+            params["host"],
+            params["port"],
+            params["database"],
+            params["user"],
+            params["password"],
+            params.get("sslmode", "require"),
         )
+        conn = psycopg2.connect(dsn)
         conn.close()
         return True, "Connection successful"
     except psycopg2.Error as e:
@@ -310,6 +465,32 @@ def validate_connection(params: dict) -> tuple[bool, str]:
         return False, f"Unexpected error: {sanitize_error(e, params)}"
 
 
+def validate_connections(names: list[str], max_workers: int = 16) -> dict[str, tuple[bool, str]]:
+    """
+    Test several saved connections concurrently.
+    
+    Returns {name: (success, message)} in the order given. Handshakes run on
+    a thread pool, so total time tracks the slowest host rather than the sum.
+    """
+    results = {}
+    pending = {}
+    for name in names:
+        params = get_connection(name)
+        if params is None:
+            results[name] = (False, f"Connection '{name}' not found (or has no host) in ~/.pg_service.conf")
+        else:
+            # Without a saved password, libpq falls back to its own lookup
+            params.setdefault("password", None)
+            pending[name] = params
+    
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+            futures = {name: pool.submit(validate_connection, params) for name, params in pending.items()}
+        results.update((name, future.result()) for name, future in futures.items())
+    
+    return {name: results[name] for name in names}
+
+
 # --- Snowflake Connection (for CREATE/RESET operations) ---
 
 def _read_agent_connection_name() -> str | None:
@@ -328,14 +509,13 @@ def _load_snowflake_connection_config(connection_name: str | None) -> tuple[str,
     connections: dict[str, dict] = {}
     default_name = None
 
-    if _SF_CONNECTIONS_TOML.exists():
-        data = tomllib.loads(_SF_CONNECTIONS_TOML.read_text())
+    if key := _file_cache_key(_SF_CONNECTIONS_TOML):
+        data = _load_toml_file(*key)
         default_name = data.get("default_connection_name")
-        for key, value in data.items():
-            if key != "default_connection_name" and isinstance(value, dict):
-                connections[key] = value
-    elif _SF_CONFIG_TOML.exists():
-        data = tomllib.loads(_SF_CONFIG_TOML.read_text())
+        # default_connection_name is a string, so the table filter excludes it
+        connections = {name: value for name, value in data.items() if isinstance(value, dict)}
+    elif key := _file_cache_key(_SF_CONFIG_TOML):
+        data = _load_toml_file(*key)
         default_name = data.get("default_connection_name")
         connections = data.get("connections", {})
 
@@ -359,20 +539,45 @@ def _load_snowflake_connection_config(connection_name: str | None) -> tuple[str,
             f"Connection '{target}' not found. Available: {', '.join(connections.keys())}"
         )
 
-    return target, connections[target]
+    # Copy so callers can't mutate the cached parse
+    return target, dict(connections[target])
 
 
-def _load_private_key(path: str, passphrase: str | None) -> object:
-    """Load a private key from file for Snowflake key-pair auth."""
+@functools.lru_cache(maxsize=4)
+def _load_toml_file(path: str, mtime_ns: int, size: int) -> dict:
+    """Parse a TOML file; cached until its mtime or size changes.
+    
+    The returned dict is shared between calls and must not be mutated.
+    """
+    text = Path(path).read_text()
+    if rtoml is not None:
+        return rtoml.loads(text)
+    return tomllib.loads(text)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_private_key_cached(path: str, mtime_ns: int, size: int, passphrase: str | None) -> object:
+    """Decode a PEM private key; keyed on the file's mtime and size."""
+    from cryptography.hazmat.primitives import serialization
+    
     key_bytes = Path(path).read_bytes()
     password = passphrase.encode() if passphrase else None
     return serialization.load_pem_private_key(key_bytes, password=password)
 
 
+def _load_private_key(path: str, passphrase: str | None) -> object:
+    """Load a private key from file for Snowflake key-pair auth.
+    
+    The decoded key is reused until the key file changes.
+    """
+    st = os.stat(path)
+    return _load_private_key_cached(path, st.st_mtime_ns, st.st_size, passphrase)
+
+
 def get_snowflake_connection(
     connection_name: str | None = None,
     authenticator: str | None = None,
-) -> snowflake.connector.SnowflakeConnection:
+) -> "snowflake.connector.SnowflakeConnection":
     """
     Get a Snowflake connection using available configuration.
 
@@ -380,6 +585,8 @@ def get_snowflake_connection(
     1. Environment variables (SNOWFLAKE_ACCOUNT, SNOWFLAKE_USER, etc.)
     2. Connection name from ~/.snowflake/connections.toml
     """
+    import snowflake.connector
+
     env_account = os.environ.get("SNOWFLAKE_ACCOUNT")
     env_user = os.environ.get("SNOWFLAKE_USER")
     if env_account and env_user:
@@ -426,8 +633,39 @@ def write_secure_json(path: str, payload: dict) -> None:
     """Write JSON to a file with 0600 permissions."""
     output_path = Path(path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(payload, indent=2))
-    os.chmod(output_path, 0o600)
+    write_private_file(output_path, _json_dumps_indented(payload))
+
+
+@functools.lru_cache(maxsize=1)
+def _recovery_writer() -> ThreadPoolExecutor:
+    """The thread that writes RECOVERY_DIR copies of CREATE/RESET responses.
+    
+    Started on first use, so other commands never spawn it. Its worker is
+    joined at interpreter exit, so pending writes complete.
+    """
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="pg_connect-recovery")
+
+
+def _write_recovery_json(path: str, response: dict) -> Future:
+    """Start writing a response to its recovery file in the background."""
+    return _recovery_writer().submit(write_secure_json, path, response)
+
+
+def _finish_recovery_json(recovery_write: Future, path: str) -> None:
+    """Wait for a recovery write, raising if the file could not be written."""
+    try:
+        recovery_write.result()
+    except Exception as e:
+        raise RuntimeError(f"Could not write recovery file {path}: {e}") from e
+
+
+def _recovery_json_warning(recovery_write: Future, path: str) -> str | None:
+    """Wait for a recovery write; describe a failure instead of raising it."""
+    try:
+        _finish_recovery_json(recovery_write, path)
+    except RuntimeError as e:
+        return str(e)
+    return None
 
 
 def create_postgres_instance(
@@ -446,34 +684,36 @@ def create_postgres_instance(
     
     Returns dict with instance info (host) without exposing passwords.
     """
-    # Build optional clauses
-    optional_clauses = []
-    if auto_suspend_secs is not None:
-        optional_clauses.append(f"AUTO_SUSPEND_SECS = {auto_suspend_secs}")
-    if enable_ha:
-        optional_clauses.append("HIGH_AVAILABILITY = TRUE")
-    if postgres_version:
-        optional_clauses.append(f"POSTGRES_VERSION = '{postgres_version}'")
-    if network_policy:
-        optional_clauses.append(f"NETWORK_POLICY = '{network_policy}'")
-    
-    optional_sql = "\n  ".join(optional_clauses)
-    if optional_sql:
-        optional_sql = "\n  " + optional_sql
-    
-    query = f"""CREATE POSTGRES INSTANCE {instance_name}
-  COMPUTE_FAMILY = '{compute_pool}'
-  STORAGE_SIZE_GB = {storage}
-  AUTHENTICATION_AUTHORITY = POSTGRES{optional_sql};"""
+    options = {
+        "auto_suspend_secs": auto_suspend_secs,
+        "enable_ha": enable_ha or None,
+        "postgres_version": postgres_version or None,
+        "network_policy": network_policy or None,
+    }
+    query = _CREATE_INSTANCE_SQL.format(
+        instance_name=instance_name,
+        compute_pool=compute_pool,
+        storage=storage,
+        optional_sql="".join(
+            clause.format(options[name])
+            for name, clause in _CREATE_INSTANCE_OPTIONS
+            if options[name] is not None
+        ),
+    )
 
     response = execute_snowflake_sql(query, snowflake_connection, authenticator)
     
     # Write to temp file for debugging/recovery
-    tmp_path = f"/tmp/pg_create_{instance_name}.json"
-    write_secure_json(tmp_path, response)
+    tmp_path = str(RECOVERY_DIR / f"pg_create_{instance_name}.json")
+    recovery_write = _write_recovery_json(tmp_path, response)
     
-    # Parse and save connection
-    conn_info = parse_create_response(tmp_path)
+    # Parse the in-memory response (the file is only for recovery) and save connection
+    try:
+        conn_info = parse_create_response_data(response)
+    except Exception:
+        # The recovery file is now the only copy: it must be on disk before reporting
+        _finish_recovery_json(recovery_write, tmp_path)
+        raise
     connection_name = instance_name.lower()
     
     save_service_entry(connection_name, conn_info)
@@ -485,11 +725,17 @@ def create_postgres_instance(
         password=conn_info["password"],
     )
     
-    return {
+    # The instance exists and its credentials are saved, so a failed write is
+    # only a warning: raising would invite a retry of the CREATE itself
+    result = {
         "instance_name": instance_name,
         "connection_name": connection_name,
         "host": conn_info["host"],
     }
+    warning = _recovery_json_warning(recovery_write, tmp_path)
+    if warning:
+        result["warning"] = warning
+    return result
 
 
 def reset_postgres_access(
@@ -510,11 +756,16 @@ def reset_postgres_access(
     response = execute_snowflake_sql(query, snowflake_connection, authenticator)
     
     # Write to temp file for debugging/recovery
-    tmp_path = f"/tmp/pg_reset_{instance_name}.json"
-    write_secure_json(tmp_path, response)
+    tmp_path = str(RECOVERY_DIR / f"pg_reset_{instance_name}.json")
+    recovery_write = _write_recovery_json(tmp_path, response)
     
-    # Parse password and update pgpass
-    new_password = parse_reset_response(tmp_path)
+    # Parse password from the in-memory response and update pgpass
+    try:
+        new_password = parse_reset_response_data(response)
+    except Exception:
+        # The recovery file is now the only copy: it must be on disk before reporting
+        _finish_recovery_json(recovery_write, tmp_path)
+        raise
     connection_name = instance_name.lower()
     
     # Get existing service entry or create from --host
@@ -531,6 +782,8 @@ def reset_postgres_access(
             }
             save_service_entry(connection_name, service_entry)
         else:
+            # The caller is pointed at tmp_path, so it must exist on return
+            _finish_recovery_json(recovery_write, tmp_path)
             return {
                 "success": False,
                 "instance_name": instance_name,
@@ -547,232 +800,390 @@ def reset_postgres_access(
         password=new_password,
     )
     
-    return {
+    # The new password is saved, so a failed write is only a warning: raising
+    # would invite another RESET, rotating the password again
+    result = {
         "success": True,
         "instance_name": instance_name,
         "connection_name": connection_name,
         "role": role,
     }
+    warning = _recovery_json_warning(recovery_write, tmp_path)
+    if warning:
+        result["warning"] = warning
+    return result
 
 
 # --- PostgreSQL Service File Management ---
 
-def load_service_file() -> configparser.ConfigParser:
-    """Load ~/.pg_service.conf as a ConfigParser object."""
-    config = configparser.ConfigParser()
-    if PG_SERVICE_FILE.exists():
-        config.read(PG_SERVICE_FILE)
-    return config
+def _file_cache_key(path: Path) -> tuple | None:
+    """Identify a file's current contents by (path, mtime, size); None if missing."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def _parse_pg_service(text: str) -> dict[str, dict[str, str]]:
+    """Parse pg_service.conf text into {service: {key: value}}.
+    
+    Handles only what libpq accepts: [name] headers and key=value lines.
+    Blank lines and '#'/';' comments are skipped; keys are lowercased.
+    """
+    services: dict[str, dict[str, str]] = {}
+    section = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] in "#;":
+            continue
+        if line[0] == "[":
+            if line[-1] == "]":
+                section = services.setdefault(line[1:-1].strip(), {})
+            continue
+        if section is None or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        section[key.strip().lower()] = value.strip()
+    return services
+
+
+def _service_snapshot() -> dict[str, dict[str, str]] | None:
+    """Return the cached parse of ~/.pg_service.conf, or None if it doesn't exist.
+    
+    Treat as read-only.
+    """
+    key = _file_cache_key(PG_SERVICE_FILE)
+    if key is None:
+        return None
+    
+    if _service_cache["key"] != key:
+        config = _parse_pg_service(PG_SERVICE_FILE.read_text())
+        _service_cache.update(key=key, config=config, entries={})
+    return _service_cache["config"]
+
+
+def load_service_file() -> dict[str, dict[str, str]]:
+    """Load ~/.pg_service.conf as a {service: {key: value}} dict.
+    
+    The parse is cached until the file changes; callers get their own copy.
+    """
+    services = _service_snapshot() or {}
+    return {name: dict(options) for name, options in services.items()}
 
 
-def save_service_file(config: configparser.ConfigParser) -> None:
+def save_service_file(config: dict[str, dict[str, str]]) -> None:
     """Save the service file in pg_service.conf format (no spaces around =)."""
+    chunks = []
+    for section, options in config.items():
+        chunks.append(f"[{section}]\n")
+        for key, value in options.items():
+            chunks.append(f"{key}={value}\n")
+        chunks.append("\n")
+    text = "".join(chunks)
+    
     with open(PG_SERVICE_FILE, "w") as f:
-        for section in config.sections():
-            f.write(f"[{section}]\n")
-            for key, value in config.items(section):
-                f.write(f"{key}={value}\n")
-            f.write("\n")
+        f.write(text)
+    
+    # Cache what a re-read would produce, without reading the file back
+    _service_cache.update(key=_file_cache_key(PG_SERVICE_FILE), config=_parse_pg_service(text), entries={})
 
 
 def get_service_entry(name: str) -> dict | None:
     """Get a service entry by name (without password).
     
     Returns None if the entry doesn't exist or is missing required 'host' field.
+    Entries are built once per parse of the file; callers get their own copy.
     """
-    config = load_service_file()
-    if name not in config.sections():
+    services = _service_snapshot()
+    if services is None:
+        return None
+    
+    entries = _service_cache["entries"]
+    if name not in entries:
+        entries[name] = _service_params(services.get(name))
+    entry = entries[name]
+    return dict(entry) if entry is not None else None
+
+
+def _service_params(options: dict[str, str] | None) -> dict | None:
+    """Build get_service_entry's result from a service's raw options."""
+    if options is None:
         return None
     
-    host = config.get(name, "host", fallback=None)
+    host = options.get("host")
     if not host:
         # Host is required - return None for invalid entries
         return None
     
     return {
         "host": host,
-        "port": config.getint(name, "port", fallback=5432),
-        "database": config.get(name, "dbname", fallback="postgres"),
-        "user": config.get(name, "user", fallback="snowflake_admin"),
-        "sslmode": config.get(name, "sslmode", fallback="require"),
+        "port": int(options.get("port", 5432)),
+        "database": options.get("dbname", "postgres"),
+        "user": options.get("user", "snowflake_admin"),
+        "sslmode": options.get("sslmode", "require"),
     }
 
 
-def save_service_entry(name: str, params: dict) -> None:
-    """Save a service entry (without password)."""
-    config = load_service_file()
+def save_service_entries(entries: dict[str, dict]) -> None:
+    """Save several service entries (without passwords) with one load and one save."""
+    if not entries:
+        return
     
-    if name not in config.sections():
-        config.add_section(name)
-    
-    config.set(name, "host", params["host"])
-    config.set(name, "port", str(params.get("port", 5432)))
-    config.set(name, "dbname", params.get("database", "postgres"))
-    config.set(name, "user", params.get("user", "snowflake_admin"))
-    config.set(name, "sslmode", params.get("sslmode", "require"))
+    # Shallow copy of the cached parse: only the named services' options are replaced
+    config = dict(_service_snapshot() or {})
+    for name, params in entries.items():
+        config[name] = {
+            **config.get(name, {}),
+            "host": params["host"],
+            "port": str(params.get("port", 5432)),
+            "dbname": params.get("database", "postgres"),
+            "user": params.get("user", "snowflake_admin"),
+            "sslmode": params.get("sslmode", "require"),
+        }
     
     save_service_file(config)
 
 
+def save_service_entry(name: str, params: dict) -> None:
+    """Save a service entry (without password)."""
+    save_service_entries({name: params})
+
+
 def delete_service_entry(name: str) -> bool:
     """Delete a service entry."""
-    config = load_service_file()
-    if name not in config.sections():
+    config = dict(_service_snapshot() or {})
+    if config.pop(name, None) is None:
         return False
     
-    config.remove_section(name)
     save_service_file(config)
     return True
 
 
 def list_service_entries() -> list[str]:
     """List all service entry names."""
-    config = load_service_file()
-    return config.sections()
+    return list(_service_snapshot() or ())
 
 
 # --- PostgreSQL Password File Management ---
 
-def load_pgpass() -> list[dict]:
+def _parse_pgpass(text: str) -> list[dict]:
     """
-    Load ~/.pgpass entries.
+    Parse pgpass file contents into entries.
     
     Format: hostname:port:database:username:password
     Lines starting with # are comments.
     """
+    # Filter out blank and comment lines in one pass before parsing the rest
+    data_lines = [line for line in map(str.strip, text.split("\n")) if line and line[0] != "#"]
+    
     entries = []
-    if not PGPASS_FILE.exists():
-        return entries
-    
-    with open(PGPASS_FILE) as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            
-            # Handle escaped colons (\:)
-            parts = []
-            current = ""
-            i = 0
-            while i < len(line):
-                if line[i] == "\\" and i + 1 < len(line) and line[i + 1] == ":":
-                    current += ":"
-                    i += 2
-                elif line[i] == ":":
-                    parts.append(current)
-                    current = ""
-                    i += 1
-                else:
-                    current += line[i]
-                    i += 1
-            parts.append(current)
-            
-            if len(parts) == 5:
-                entries.append({
-                    "host": parts[0],
-                    "port": parts[1],
-                    "database": parts[2],
-                    "user": parts[3],
-                    "password": parts[4],
-                })
+    for line in data_lines:
+        # Handle escapes (\\ and \:): swap them for placeholders, split, restore
+        escaped = line.replace("\\\\", "\x00").replace("\\:", "\x01")
+        parts = [
+            part.replace("\x01", ":").replace("\x00", "\\")
+            for part in escaped.split(":")
+        ]
+        
+        if len(parts) == 5:
+            entries.append({
+                "host": parts[0],
+                "port": parts[1],
+                "database": parts[2],
+                "user": parts[3],
+                "password": parts[4],
+            })
     
     return entries
 
 
+def _pgpass_key(host: str, port: int | str, database: str, user: str) -> tuple[str, str, str, str]:
+    """Exact-match key for a pgpass entry."""
+    return (str(host), str(port), str(database), str(user))
+
+
+def _cache_pgpass(key: tuple | None, entries: list[dict]) -> None:
+    """
+    Store parsed pgpass entries with their lookup structures.
+    
+    - index: exact (host, port, database, user) -> position of first such entry
+    - wildcards: positions (ascending) of entries with a '*' field
+    """
+    index: dict[tuple[str, str, str, str], int] = {}
+    wildcards: list[int] = []
+    for i, entry in enumerate(entries):
+        fields = (entry["host"], entry["port"], entry["database"], entry["user"])
+        index.setdefault(_pgpass_key(*fields), i)
+        if "*" in fields:
+            wildcards.append(i)
+    _pgpass_cache.update(key=key, entries=entries, index=index, wildcards=wildcards)
+
+
+def _pgpass_snapshot() -> tuple[list[dict], dict, list[int]] | None:
+    """Return the cached (entries, index, wildcards) for ~/.pgpass, or None if it doesn't exist.
+    
+    Treat as read-only.
+    """
+    key = _file_cache_key(PGPASS_FILE)
+    if key is None:
+        return None
+    
+    if _pgpass_cache["key"] != key:
+        _cache_pgpass(key, _parse_pgpass(PGPASS_FILE.read_text()))
+    return _pgpass_cache["entries"], _pgpass_cache["index"], _pgpass_cache["wildcards"]
+
+
+def load_pgpass() -> list[dict]:
+    """
+    Load ~/.pgpass entries.
+    
+    The parse is cached until the file changes; callers get their own copies
+    of the entries.
+    """
+    entries, _, _ = _pgpass_snapshot() or _EMPTY_PGPASS
+    return [dict(entry) for entry in entries]
+
+
+def _escape_pgpass_field(value) -> str:
+    """Escape backslashes and colons (colons are field delimiters in pgpass format)."""
+    return str(value).replace("\\", "\\\\").replace(":", "\\:")
+
+
+def _pgpass_password(value) -> str:
+    """A password as pgpass stores it: newlines stripped (one entry per line)."""
+    return str(value).replace("\n", "").replace("\r", "")
+
+
+def _escape_pgpass_password(value) -> str:
+    """Escape a password field, stripping newlines (one entry per line)."""
+    return _escape_pgpass_field(_pgpass_password(value))
+
+
 def save_pgpass(entries: list[dict]) -> None:
     """Save entries to ~/.pgpass with secure permissions."""
-    lines = []
-    for entry in entries:
-        # Escape backslashes and colons in all fields
-        # Also strip newlines from password to prevent file corruption
-        def escape(s):
-            return str(s).replace("\\", "\\\\").replace(":", "\\:")
-        
-        def escape_password(s):
-            # Escape backslashes and colons (colons are field delimiters in pgpass format).
-            # Strip newlines to prevent file corruption (one entry per line).
-            return str(s).replace("\\", "\\\\").replace(":", "\\:").replace("\n", "").replace("\r", "")
-        
-        line = ":".join([
-            escape(entry["host"]),
-            str(entry.get("port", "*")),
-            escape(entry.get("database", "*")),
-            escape(entry.get("user", "*")),
-            escape_password(entry["password"]),
-        ])
-        lines.append(line)
-    
-    with open(PGPASS_FILE, "w") as f:
-        f.write("# PostgreSQL password file - managed by pg_connect.py\n")
-        f.write("# Format: hostname:port:database:username:password\n")
-        f.write("\n".join(lines))
-        if lines:
-            f.write("\n")
-    
-    # Enforce secure permissions (required by PostgreSQL)
-    os.chmod(PGPASS_FILE, 0o600)
+    text = "".join([
+        "# PostgreSQL password file - managed by pg_connect.py\n"
+        "# Format: hostname:port:database:username:password\n",
+        *(
+            f"{_escape_pgpass_field(entry['host'])}"
+            f":{entry.get('port', '*')}"
+            f":{_escape_pgpass_field(entry.get('database', '*'))}"
+            f":{_escape_pgpass_field(entry.get('user', '*'))}"
+            f":{_escape_pgpass_password(entry['password'])}\n"
+            for entry in entries
+        ),
+    ])
+    
+    # Created 0600 from the start (PostgreSQL ignores looser permissions)
+    write_private_file(PGPASS_FILE, text)
+    
+    # Cache what a re-read would produce, without reading the file back
+    _cache_pgpass(_file_cache_key(PGPASS_FILE), _parse_pgpass(text))
 
 
 def find_pgpass_entry(host: str, port: int, database: str, user: str) -> dict | None:
-    """Find a matching pgpass entry."""
-    entries = load_pgpass()
-    for entry in entries:
+    """Find a matching pgpass entry.
+    
+    Like libpq, the first matching line wins, whether it matches exactly or
+    via '*' wildcards.
+    """
+    return _match_pgpass_entry(_pgpass_snapshot() or _EMPTY_PGPASS, host, port, database, user)
+
+
+def _match_pgpass_entry(
+    snapshot: tuple[list[dict], dict, list[int]], host: str, port: int, database: str, user: str,
+) -> dict | None:
+    """find_pgpass_entry against an already-loaded pgpass snapshot."""
+    entries, index, wildcards = snapshot
+    match = index.get(_pgpass_key(host, port, database, user))
+    
+    # A wildcard line only wins if it comes before the exact match
+    for i in wildcards:
+        if match is not None and i > match:
+            break
+        entry = entries[i]
         if (
             (entry["host"] == "*" or entry["host"] == host) and
             (entry["port"] == "*" or str(entry["port"]) == str(port)) and
             (entry["database"] == "*" or entry["database"] == database) and
             (entry["user"] == "*" or entry["user"] == user)
         ):
-            return entry
-    return None
+            match = i
+            break
+    
+    return dict(entries[match]) if match is not None else None
 
 
-def upsert_pgpass_entry(host: str, port: int, database: str, user: str, password: str) -> None:
-    """Add or update a pgpass entry."""
-    entries = load_pgpass()
+def _pgpass_entry_matches(entries: list[dict], index: dict, update: dict) -> bool:
+    """Whether the exact entry for update already stores update's password."""
+    i = index.get(_pgpass_key(update["host"], update["port"], update["database"], update["user"]))
+    return i is not None and entries[i]["password"] == _pgpass_password(update["password"])
+
+
+def upsert_pgpass_entries(updates: list[dict]) -> None:
+    """
+    Add or update several pgpass entries with one load and one save.
     
-    # Find and update existing entry
-    for entry in entries:
-        if (
-            entry["host"] == host and
-            str(entry["port"]) == str(port) and
-            entry["database"] == database and
-            entry["user"] == user
-        ):
-            entry["password"] = password
-            save_pgpass(entries)
-            return
+    Each update is a dict with host, port, database, user, password.
+    The file is not rewritten if every entry already has its password, but
+    loose permissions are still tightened to 0600 (libpq ignores the file
+    otherwise).
+    """
+    if not updates:
+        return
+    
+    cached_entries, cached_index, _ = _pgpass_snapshot() or _EMPTY_PGPASS
+    if all(_pgpass_entry_matches(cached_entries, cached_index, update) for update in updates):
+        if PGPASS_FILE.stat().st_mode & 0o077:
+            PGPASS_FILE.chmod(0o600)
+        return
+    
+    entries = [dict(entry) for entry in cached_entries]
+    index = dict(cached_index)
+    
+    for update in updates:
+        key = _pgpass_key(update["host"], update["port"], update["database"], update["user"])
+        if key in index:
+            entries[index[key]]["password"] = update["password"]
+        else:
+            index[key] = len(entries)
+            entries.append({
+                "host": update["host"],
+                "port": update["port"],
+                "database": update["database"],
+                "user": update["user"],
+                "password": update["password"],
+            })
     
-    # Add new entry
-    entries.append({
+    save_pgpass(entries)
+
+
+def upsert_pgpass_entry(host: str, port: int, database: str, user: str, password: str) -> None:
+    """Add or update a pgpass entry."""
+    upsert_pgpass_entries([{
         "host": host,
         "port": port,
         "database": database,
         "user": user,
         "password": password,
-    })
-    save_pgpass(entries)
+    }])
 
 
 def delete_pgpass_entry(host: str, port: int, database: str, user: str) -> bool:
     """Delete a pgpass entry."""
-    entries = load_pgpass()
-    original_len = len(entries)
+    cached_entries, index, _ = _pgpass_snapshot() or _EMPTY_PGPASS
+    key = _pgpass_key(host, port, database, user)
+    if key not in index:
+        return False
     
+    # Drop every exact duplicate; keep the rest in order (first match wins in pgpass)
     entries = [
-        e for e in entries
-        if not (
-            e["host"] == host and
-            str(e["port"]) == str(port) and
-            e["database"] == database and
-            e["user"] == user
-        )
+        dict(e) for e in cached_entries
+        if _pgpass_key(e["host"], e["port"], e["database"], e["user"]) != key
     ]
-    
-    if len(entries) < original_len:
-        save_pgpass(entries)
-        return True
-    return False
+    save_pgpass(entries)
+    return True
 
 
 # --- Combined Operations ---
@@ -791,10 +1202,13 @@ def save_connection(name: str, params: dict) -> dict:
       - password_updated: bool - True if password entry was updated (vs created)
       - roles_saved: list[str] - names of roles saved to pgpass
     """
+    # One stat per file: the cached snapshots already know whether it exists
+    services = _service_snapshot()
+    pgpass = _pgpass_snapshot()
     result = {
-        "service_existed": PG_SERVICE_FILE.exists(),
-        "connection_existed": get_service_entry(name) is not None,
-        "pgpass_existed": PGPASS_FILE.exists(),
+        "service_existed": services is not None,
+        "connection_existed": services is not None and _service_params(services.get(name)) is not None,
+        "pgpass_existed": pgpass is not None,
         "password_updated": False,
         "roles_saved": [],
     }
@@ -805,8 +1219,8 @@ def save_connection(name: str, params: dict) -> dict:
     
     # Check if primary pgpass entry already exists
     if params.get("password"):
-        existing_pgpass = find_pgpass_entry(
-            host, port, database,
+        existing_pgpass = _match_pgpass_entry(
+            pgpass or _EMPTY_PGPASS, host, port, database,
             params.get("user", "snowflake_admin"),
         )
         result["password_updated"] = existing_pgpass is not None
@@ -817,11 +1231,14 @@ def save_connection(name: str, params: dict) -> dict:
     # Save passwords to pgpass - either all access_roles or just primary user
     access_roles = params.get("access_roles", [])
     if access_roles:
-        # CREATE response with multiple roles - save all to pgpass
-        for role in access_roles:
-            if role.get("name") and role.get("password"):
-                upsert_pgpass_entry(host, port, database, role["name"], role["password"])
-                result["roles_saved"].append(role["name"])
+        # CREATE response with multiple roles - save all to pgpass in one write
+        updates = [
+            {"host": host, "port": port, "database": database, "user": role["name"], "password": role["password"]}
+            for role in access_roles
+            if role.get("name") and role.get("password")
+        ]
+        upsert_pgpass_entries(updates)
+        result["roles_saved"].extend(update["user"] for update in updates)
     elif params.get("password"):
         # Single user/password (e.g., from connection string)
         user = params.get("user", "snowflake_admin")
@@ -856,9 +1273,14 @@ def get_connection(name: str) -> dict | None:
 
 def delete_connection(name: str) -> bool:
     """Delete a connection from both service file and pgpass."""
-    service = get_service_entry(name)
-    
-    service_deleted = delete_service_entry(name)
+    # One load and at most one write per file
+    config = dict(_service_snapshot() or {})
+    options = config.pop(name, None)
+    service_deleted = options is not None
+    if service_deleted:
+        save_service_file(config)
+    
+    service = _service_params(options)
     pgpass_deleted = False
     
     if service:
@@ -916,7 +1338,299 @@ def get_connect_params(connection: str = None, connection_name: str = None) -> d
     return params
 
 
-def main():
+def _list_output() -> dict:
+    """Output for --list."""
+    names = list_connections()
+    return {
+        "success": True,
+        "message": f"Found {len(names)} saved connections in ~/.pg_service.conf",
+        "data": names,
+    }
+
+
+def _overview_output() -> dict:
+    """Output when no action is given: where connections live and what's saved."""
+    names = list_connections()
+    if names:
+        return {
+            "success": True,
+            "message": (
+                "Connections stored in:\n"
+                "  ~/.pg_service.conf (connection profiles)\n"
+                "  ~/.pgpass (passwords)\n"
+                "Use --connection to add or --list to see saved"
+            ),
+            "data": {"saved_connections": names},
+        }
+    return {
+        "success": True,
+        "message": (
+            "No saved connections.\n"
+            "Use --connection to add one, or manually edit:\n"
+            "  ~/.pg_service.conf (connection profiles)\n"
+            "  ~/.pgpass (passwords, chmod 600)"
+        ),
+        "data": None,
+    }
+
+
+def _record_error(output: dict, error: Exception) -> None:
+    """Mark output as failed with a (truncated) description of error."""
+    output["success"] = False
+    if isinstance(error, ValueError):
+        output["message"] = str(error)
+        return
+    
+    # Show actual error for debugging (Snowflake errors contain useful info)
+    error_msg = str(error)
+    # Truncate very long error messages but keep the important parts
+    if len(error_msg) > 500:
+        error_msg = error_msg[:500] + "..."
+    output["message"] = f"Error: {type(error).__name__}: {error_msg}"
+
+
+def _print_output(output: dict, as_json: bool) -> None:
+    """Print a command's result as JSON or human-readable text."""
+    if as_json:
+        print(_json_dumps_indented(output))
+        return
+    
+    # Assemble the whole text and write it once rather than printing per line
+    chunks = []
+    if output["message"]:
+        prefix = "✅" if output["success"] else "❌"
+        chunks.append(f"{prefix} {output['message']}\n")
+    if output["data"]:
+        if isinstance(output["data"], list):
+            chunks.extend(f"  - {item}\n" for item in output["data"])
+        elif isinstance(output["data"], dict):
+            # Never print secret fields even if they somehow got into output
+            chunks.extend(
+                f"  {k}: {v}\n" for k, v in output["data"].items() if k not in _SECRET_FIELDS
+            )
+    if output.get("warning"):
+        chunks.append(f"⚠️ {output['warning']}\n")
+    sys.stdout.write("".join(chunks))
+
+
+def _create_output(args: argparse.Namespace) -> dict:
+    """Output for --create: create the instance via Snowflake and save it."""
+    if not args.instance_name:
+        print("❌ --instance-name is required for --create", file=sys.stderr)
+        sys.exit(1)
+    if not args.compute_pool:
+        print("❌ --compute-pool is required for --create", file=sys.stderr)
+        sys.exit(1)
+    if not args.storage:
+        print("❌ --storage is required for --create", file=sys.stderr)
+        sys.exit(1)
+    if args.role != "snowflake_admin":
+        print("❌ --role is for --reset, not --create (CREATE creates all roles automatically)", file=sys.stderr)
+        sys.exit(1)
+    
+    result = create_postgres_instance(
+        instance_name=args.instance_name,
+        compute_pool=args.compute_pool,
+        storage=args.storage,
+        auto_suspend_secs=args.auto_suspend_secs,
+        enable_ha=args.enable_ha,
+        postgres_version=args.postgres_version,
+        network_policy=args.network_policy,
+        snowflake_connection=args.snowflake_connection,
+        authenticator=args.authenticator,
+    )
+    output = {
+        "success": True,
+        "message": (
+            f"Created instance {result['instance_name']}\n"
+            f"   Host: {result['host']}\n"
+            "⏳ Instance is provisioning (1-2 minutes)\n"
+            "✅ Connection saved to ~/.pg_service.conf\n"
+            "✅ Password saved to ~/.pgpass\n"
+            f"   Connect with: psql \"service={result['connection_name']}\""
+        ),
+        "data": {"host": result["host"]},
+    }
+    if "warning" in result:
+        output["warning"] = result["warning"]
+    return output
+
+
+def _reset_output(args: argparse.Namespace) -> dict:
+    """Output for --reset: reset credentials via Snowflake and update pgpass."""
+    if not args.instance_name:
+        print("❌ --instance-name is required for --reset", file=sys.stderr)
+        sys.exit(1)
+    if args.host and _PLACEHOLDER_HOST_RE.fullmatch(args.host):
+        # Checked before the RESET runs: a bad host would strand the new password
+        print(
+            f"❌ --host '{args.host}' looks like a placeholder; "
+            "pass the instance's real host (see DESCRIBE POSTGRES INSTANCE)",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    
+    result = reset_postgres_access(
+        instance_name=args.instance_name,
+        role=args.role,
+        host=args.host,
+        snowflake_connection=args.snowflake_connection,
+        authenticator=args.authenticator,
+    )
+    if result["success"]:
+        message = (
+            f"Reset credentials for {result['instance_name']} ({result['role']})\n"
+            "✅ Password updated in ~/.pgpass\n"
+            f"   Connect with: psql \"service={result['connection_name']}\""
+        )
+    else:
+        message = (
+            f"{result['message']}\n"
+            f"Response saved to: {result['tmp_path']}\n"
+            f"Run: pg_connect.py --from-reset-response {result['tmp_path']} --connection-name {args.instance_name.lower()}"
+        )
+    output = {"success": result["success"], "message": message, "data": None}
+    if "warning" in result:
+        output["warning"] = result["warning"]
+    return output
+
+
+def _update_password_output(args: argparse.Namespace) -> dict:
+    """Output for --from-reset-response: store the new password in pgpass."""
+    if update_password(args.connection_name, args._update_password_from_file):
+        return {
+            "success": True,
+            "message": (
+                f"Password for '{args.connection_name}' updated in ~/.pgpass\n"
+                f"Connect with: psql \"service={args.connection_name}\""
+            ),
+            "data": None,
+        }
+    return {
+        "success": False,
+        "message": f"Connection '{args.connection_name}' not found in ~/.pg_service.conf",
+        "data": None,
+    }
+
+
+def _delete_output(args: argparse.Namespace) -> dict:
+    """Output for --delete."""
+    if delete_connection(args.delete):
+        return {
+            "success": True,
+            "message": f"Deleted connection '{args.delete}' from service file and pgpass",
+            "data": None,
+        }
+    return {"success": False, "message": f"Connection '{args.delete}' not found", "data": None}
+
+
+def _connection_output(args: argparse.Namespace) -> dict:
+    """Output for --connection/--from-response: optionally test and save it."""
+    output = {"success": True, "message": "", "data": None}
+    if args.from_response:
+        params = args._params_from_args
+    else:
+        params = parse_connection_string(args.connection)
+    
+    if args.test:
+        success, msg = validate_connection(params)
+        output["success"] = success
+        output["message"] = msg
+        
+    if args.save and output["success"]:
+        save_result = save_connection(args.connection_name, params)
+        verb = "updated" if save_result["connection_existed"] else "saved"
+        output["message"] = (
+            f"Connection '{args.connection_name}' {verb}\n"
+            "  Service file: ~/.pg_service.conf\n"
+            "  Password: ~/.pgpass\n"
+            f"Connect with: psql \"service={args.connection_name}\""
+        )
+        
+    if output["success"]:
+        # Filter out secrets from display output, noting the password on the way
+        display_params = {}
+        has_password = False
+        for k, v in params.items():
+            if k == "password":
+                has_password = bool(v)
+            elif k not in _SECRET_FIELDS:
+                display_params[k] = v
+        display_params["has_password"] = has_password
+        output["data"] = display_params
+    
+    return output
+
+
+def _test_all_output(args: argparse.Namespace) -> dict:
+    """Output for --list --test: test every saved connection concurrently."""
+    results = validate_connections(list_connections())
+    failed = sum(1 for success, _ in results.values() if not success)
+    return {
+        "success": failed == 0,
+        "message": f"Tested {len(results)} saved connections: {len(results) - failed} ok, {failed} failed",
+        "data": {name: message for name, (_, message) in results.items()},
+    }
+
+
+def _select_action(args: argparse.Namespace) -> str:
+    """Pick the action for parsed arguments, in priority order."""
+    if args.create:
+        return "create"
+    if args.reset:
+        return "reset"
+    if args.from_reset_response and not args.from_response:
+        return "update_password"
+    if args.list:
+        return "test_all" if args.test else "list"
+    if args.delete:
+        return "delete"
+    if args.connection or args.from_response:
+        return "connection"
+    return "overview"
+
+
+# Action (from _select_action) -> function building its output
+_ACTION_OUTPUTS = {
+    "create": _create_output,
+    "reset": _reset_output,
+    "update_password": _update_password_output,
+    "list": lambda args: _list_output(),
+    "test_all": _test_all_output,
+    "delete": _delete_output,
+    "connection": _connection_output,
+    "overview": lambda args: _overview_output(),
+}
+
+
+# Read-only invocations answered without building the argparse parser:
+# argv -> (output builder, as_json)
+_FAST_PATHS = {
+    (): (_overview_output, False),
+    ("--json",): (_overview_output, True),
+    ("--list",): (_list_output, False),
+    ("-l",): (_list_output, False),
+    ("--list", "--json"): (_list_output, True),
+    ("-l", "--json"): (_list_output, True),
+    ("--json", "--list"): (_list_output, True),
+    ("--json", "-l"): (_list_output, True),
+}
+
+
+def main(argv: list[str] | None = None):
+    if argv is None:
+        argv = sys.argv[1:]
+    fast_path = _FAST_PATHS.get(tuple(argv))
+    if fast_path is not None:
+        build_output, as_json = fast_path
+        output = {"success": True, "message": "", "data": None}
+        try:
+            output = build_output()
+        except Exception as e:
+            _record_error(output, e)
+        _print_output(output, as_json)
+        sys.exit(0 if output["success"] else 1)
+    
     parser = argparse.ArgumentParser(
         description="Manage Postgres connections using standard PostgreSQL files",
         epilog="Connections stored in ~/.pg_service.conf and ~/.pgpass",
@@ -924,7 +1638,8 @@ def main():
     parser.add_argument("--connection", "-c", help="Connection string (postgres://...)")
     parser.add_argument("--connection-name", "-n", default="default", help="Name for saved connection")
     parser.add_argument("--save", "-s", action="store_true", help="Save the connection")
-    parser.add_argument("--test", "-t", action="store_true", help="Test the connection")
+    parser.add_argument("--test", "-t", action="store_true",
+                        help="Test the connection (with --list: test all saved connections concurrently)")
     parser.add_argument("--list", "-l", action="store_true", help="List saved connections")
     parser.add_argument("--delete", "-d", help="Delete a saved connection")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
@@ -949,7 +1664,7 @@ def main():
     parser.add_argument("--snowflake-connection", help="Snowflake connection name from ~/.snowflake/connections.toml")
     parser.add_argument("--authenticator", help="Snowflake authenticator (e.g., externalbrowser)")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Handle --from-response: extract credentials from CREATE response file
     if args.from_response:
@@ -974,175 +1689,11 @@ def main():
     output = {"success": True, "message": "", "data": None}
     
     try:
-        # Handle --create: Create Postgres instance via Snowflake
-        if args.create:
-            if not args.instance_name:
-                print("❌ --instance-name is required for --create", file=sys.stderr)
-                sys.exit(1)
-            if not args.compute_pool:
-                print("❌ --compute-pool is required for --create", file=sys.stderr)
-                sys.exit(1)
-            if not args.storage:
-                print("❌ --storage is required for --create", file=sys.stderr)
-                sys.exit(1)
-            if args.role != "snowflake_admin":
-                print("❌ --role is for --reset, not --create (CREATE creates all roles automatically)", file=sys.stderr)
-                sys.exit(1)
-            
-            result = create_postgres_instance(
-                instance_name=args.instance_name,
-                compute_pool=args.compute_pool,
-                storage=args.storage,
-                auto_suspend_secs=args.auto_suspend_secs,
-                enable_ha=args.enable_ha,
-                postgres_version=args.postgres_version,
-                network_policy=args.network_policy,
-                snowflake_connection=args.snowflake_connection,
-                authenticator=args.authenticator,
-            )
-            output["data"] = {"host": result["host"]}
-            output["message"] = (
-                f"Created instance {result['instance_name']}\n"
-                f"   Host: {result['host']}\n"
-                f"⏳ Instance is provisioning (1-2 minutes)\n"
-                f"✅ Connection saved to ~/.pg_service.conf\n"
-                f"✅ Password saved to ~/.pgpass\n"
-                f"   Connect with: psql \"service={result['connection_name']}\""
-            )
-        
-        # Handle --reset: Reset credentials via Snowflake
-        elif args.reset:
-            if not args.instance_name:
-                print("❌ --instance-name is required for --reset", file=sys.stderr)
-                sys.exit(1)
-            
-            result = reset_postgres_access(
-                instance_name=args.instance_name,
-                role=args.role,
-                host=args.host,
-                snowflake_connection=args.snowflake_connection,
-                authenticator=args.authenticator,
-            )
-            if result["success"]:
-                output["message"] = (
-                    f"Reset credentials for {result['instance_name']} ({result['role']})\n"
-                    f"✅ Password updated in ~/.pgpass\n"
-                    f"   Connect with: psql \"service={result['connection_name']}\""
-                )
-            else:
-                output["success"] = False
-                output["message"] = (
-                    f"{result['message']}\n"
-                    f"Response saved to: {result['tmp_path']}\n"
-                    f"Run: pg_connect.py --from-reset-response {result['tmp_path']} --connection-name {args.instance_name.lower()}"
-                )
-        
-        # Handle password update from reset response file
-        elif hasattr(args, '_update_password_from_file'):
-            if update_password(args.connection_name, args._update_password_from_file):
-                output["message"] = (
-                    f"Password for '{args.connection_name}' updated in ~/.pgpass\n"
-                    f"Connect with: psql \"service={args.connection_name}\""
-                )
-            else:
-                output["success"] = False
-                output["message"] = f"Connection '{args.connection_name}' not found in ~/.pg_service.conf"
-                
-        elif args.list:
-            names = list_connections()
-            output["data"] = names
-            output["message"] = f"Found {len(names)} saved connections in ~/.pg_service.conf"
-            
-        elif args.delete:
-            if delete_connection(args.delete):
-                output["message"] = f"Deleted connection '{args.delete}' from service file and pgpass"
-            else:
-                output["success"] = False
-                output["message"] = f"Connection '{args.delete}' not found"
-                
-        elif args.connection or hasattr(args, '_params_from_args'):
-            if hasattr(args, '_params_from_args'):
-                params = args._params_from_args
-            else:
-                params = parse_connection_string(args.connection)
-            
-            if args.test:
-                success, msg = validate_connection(params)
-                output["success"] = success
-                output["message"] = msg
-                
-            if args.save and output["success"]:
-                save_result = save_connection(args.connection_name, params)
-                if output["success"]:
-                    if save_result["connection_existed"]:
-                        output["message"] = (
-                            f"Connection '{args.connection_name}' updated\n"
-                            f"  Service file: ~/.pg_service.conf\n"
-                            f"  Password: ~/.pgpass\n"
-                            f"Connect with: psql \"service={args.connection_name}\""
-                        )
-                    else:
-                        output["message"] = (
-                            f"Connection '{args.connection_name}' saved\n"
-                            f"  Service file: ~/.pg_service.conf\n"
-                            f"  Password: ~/.pgpass\n"
-                            f"Connect with: psql \"service={args.connection_name}\""
-                        )
-                
-            if output["success"]:
-                # Filter out secrets from display output
-                secret_keys = {"password", "access_roles"}
-                display_params = {k: v for k, v in params.items() if k not in secret_keys}
-                display_params["has_password"] = bool(params.get("password"))
-                output["data"] = display_params
-            
-        else:
-            names = list_connections()
-            if names:
-                output["data"] = {"saved_connections": names}
-                output["message"] = (
-                    "Connections stored in:\n"
-                    "  ~/.pg_service.conf (connection profiles)\n"
-                    "  ~/.pgpass (passwords)\n"
-                    "Use --connection to add or --list to see saved"
-                )
-            else:
-                output["message"] = (
-                    "No saved connections.\n"
-                    "Use --connection to add one, or manually edit:\n"
-                    "  ~/.pg_service.conf (connection profiles)\n"
-                    "  ~/.pgpass (passwords, chmod 600)"
-                )
-                
-    except ValueError as e:
-        output["success"] = False
-        output["message"] = str(e)
+        output = _ACTION_OUTPUTS[_select_action(args)](args)
     except Exception as e:
-        output["success"] = False
-        # Show actual error for debugging (Snowflake errors contain useful info)
-        error_msg = str(e)
-        # Truncate very long error messages but keep the important parts
-        if len(error_msg) > 500:
-            error_msg = error_msg[:500] + "..."
-        output["message"] = f"Error: {type(e).__name__}: {error_msg}"
-    
-    if args.json:
-        print(json.dumps(output, indent=2))
-    else:
-        if output["message"]:
-            prefix = "✅" if output["success"] else "❌"
-            print(f"{prefix} {output['message']}")
-        if output["data"]:
-            if isinstance(output["data"], list):
-                for item in output["data"]:
-                    print(f"  - {item}")
-            elif isinstance(output["data"], dict):
-                # Never print secret fields even if they somehow got into output
-                secret_fields = {"password", "access_roles"}
-                for k, v in output["data"].items():
-                    if k not in secret_fields:
-                        print(f"  {k}: {v}")
+        _record_error(output, e)
     
+    _print_output(output, args.json)
     sys.exit(0 if output["success"] else 1)
 
 
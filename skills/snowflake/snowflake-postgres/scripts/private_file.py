@@ -0,0 +1,42 @@
+"""
+Private file writes shared by pg_connect.py and network_policy_check.py.
+
+Files are replaced atomically and are 0600 from creation, so credentials
+and cached responses are never briefly readable by other users.
+"""
+
+import contextlib
+import os
+import tempfile
+from pathlib import Path
+
+
+def write_private_file(path: Path, text: str) -> None:
+    """Atomically replace path with text, created with 0600 permissions.
+    
+    The data goes to a uniquely named sibling temp file (mkstemp creates it
+    0600, and no other process can predict or share its name), is flushed to
+    disk, then is renamed over path; the directory is synced too, so the
+    rename itself survives a crash. A symlinked path (e.g. a dotfile
+    manager's ~/.pgpass) is resolved first, so the link target is replaced
+    and the link itself is kept.
+    """
+    target = Path(path).resolve()
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            # One fsync so a crash can't leave an empty file after the rename
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, target)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_name)
+        raise
+    
+    dir_fd = os.open(target.parent, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
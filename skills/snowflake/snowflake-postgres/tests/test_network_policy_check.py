@@ -0,0 +1,432 @@
+"""Tests for network_policy_check.py CIDR matching, caching and CLI helpers."""
+
+import argparse
+import http.client
+import ipaddress
+import json
+import os
+import time
+
+import pytest
+import snowflake.connector
+
+import network_policy_check
+from network_policy_check import (
+    _compile_cidr_list,
+    build_parser,
+    _parse_cidr_range,
+    _policy_cache_path,
+    check_connection_config,
+    check_ip_against_policy,
+    cidr_matcher,
+    clear_connection_config_cache,
+    get_connection,
+    get_public_ip,
+    ip_in_cidr_list,
+    main,
+    parse_ip_list,
+    read_cached_policy,
+    write_cached_policy,
+)
+
+
+@pytest.fixture
+def no_snowflake_env(monkeypatch):
+    """Clear SNOWFLAKE_* variables so only args and config files apply."""
+    for name in network_policy_check.CONFIG_ENV_VARS:
+        monkeypatch.delenv(name, raising=False)
+
+
+class TestCidrMatching:
+    """Tests for CIDR parsing and membership checks."""
+    
+    @pytest.mark.parametrize("ip,cidrs,expected", [
+        pytest.param("10.1.2.3", ["10.0.0.0/8"], True, id="ipv4_inside"),
+        pytest.param("11.0.0.0", ["10.0.0.0/8"], False, id="ipv4_outside"),
+        pytest.param("10.255.255.255", ["10.0.0.0/8"], True, id="ipv4_last_address"),
+        pytest.param("9.255.255.255", ["10.0.0.0/8"], False, id="ipv4_just_below"),
+        pytest.param("1.2.3.4", ["1.2.3.4/32"], True, id="slash_32"),
+        pytest.param("1.2.3.5", ["1.2.3.4/32"], False, id="slash_32_neighbour"),
+        pytest.param("1.2.3.4", ["1.2.3.4"], True, id="bare_address"),
+        pytest.param("203.0.113.9", ["0.0.0.0/0"], True, id="ipv4_slash_0"),
+        pytest.param("10.9.9.9", ["10.1.2.3/8"], True, id="host_bits_ignored"),
+        pytest.param("2001:db8::1", ["2001:db8::/32"], True, id="ipv6_inside"),
+        pytest.param("2001:db9::1", ["2001:db8::/32"], False, id="ipv6_outside"),
+        pytest.param("2001:db8::1", ["::/0"], True, id="ipv6_slash_0"),
+        pytest.param("::1", ["::1"], True, id="ipv6_bare_address"),
+        pytest.param("2001:db8::1", ["0.0.0.0/0"], False, id="ipv6_not_in_ipv4_range"),
+        pytest.param("10.0.0.1", ["::/0"], False, id="ipv4_not_in_ipv6_range"),
+        pytest.param("not-an-ip", ["0.0.0.0/0"], False, id="invalid_ip"),
+        pytest.param("10.0.0.1", ["'10.0.0.0/8'", " ", ""], True, id="quoted_and_blank_entries"),
+    ])
+    def test_ip_in_cidr_list(self, ip, cidrs, expected):
+        """Membership across families, prefix extremes and list formatting."""
+        assert ip_in_cidr_list(ip, cidrs) is expected
+        assert cidr_matcher(cidrs)(ip) is expected
+    
+    @pytest.mark.parametrize("cidr", [
+        "1.2.3.4/",
+        "999.0.0.1/8",
+        "999.0.0.1",
+        "1.2.3.4/33",
+        "1.2.3.4/-1",
+        "1.2.3.4/ 8",
+        "1.2.3",
+        "::1/129",
+        "2001:db8::/",
+        "garbage",
+    ])
+    def test_malformed_entries_rejected(self, cidr):
+        """Malformed CIDRs are invalid, never widened or narrowed to a /32."""
+        assert _parse_cidr_range(cidr) is None
+        assert parse_ip_list(f"['{cidr}', '10.0.0.0/8']") == ["10.0.0.0/8"]
+        assert ip_in_cidr_list("1.2.3.4", [cidr]) is False
+        assert ip_in_cidr_list("999.0.0.1", [cidr]) is False
+    
+    def test_parse_matches_ipaddress(self):
+        """The integer fast path agrees with the ipaddress module."""
+        for cidr in ["192.168.1.77/24", "1.2.3.4/08", "1.2.3.4/255.0.0.0", "0.0.0.0/0", "8.8.8.8"]:
+            network = ipaddress.ip_network(cidr if "/" in cidr else f"{cidr}/32", strict=False)
+            expected = (4, int(network.network_address), int(network.broadcast_address))
+            assert _parse_cidr_range(cidr) == expected
+    
+    def test_overlapping_and_adjacent_ranges_merged(self):
+        """Overlapping and touching ranges collapse into one sorted range."""
+        compiled = _compile_cidr_list((
+            "10.0.1.0/24",
+            "10.0.0.0/24",  # adjacent below
+            "10.0.0.128/25",  # inside
+            "10.0.2.0/23",  # overlaps and extends
+            "10.0.5.0/24",  # gap before this one
+            "2001:db8::/33",
+            "2001:db8:8000::/33",  # adjacent IPv6 half
+        ))
+        
+        starts, ends = compiled[4]
+        assert [str(ipaddress.ip_address(x)) for x in starts] == ["10.0.0.0", "10.0.5.0"]
+        assert [str(ipaddress.ip_address(x)) for x in ends] == ["10.0.3.255", "10.0.5.255"]
+        assert compiled[6] == (
+            [int(ipaddress.ip_address("2001:db8::"))],
+            [int(ipaddress.ip_address("2001:db8:ffff:ffff:ffff:ffff:ffff:ffff"))],
+        )
+        assert ip_in_cidr_list("10.0.3.255", ["10.0.2.0/23", "10.0.1.0/24"]) is True
+        assert ip_in_cidr_list("10.0.4.0", ["10.0.2.0/23", "10.0.5.0/24"]) is False
+    
+    @pytest.mark.parametrize("ip,status", [
+        ("10.1.2.3", "BLOCKED"),
+        ("10.200.0.1", "ALLOWED"),
+        ("192.0.2.1", "NOT_ALLOWED"),
+    ])
+    def test_blocked_takes_precedence(self, monkeypatch, ip, status):
+        """An IP in both lists is blocked; allowed only applies otherwise."""
+        policy = {"allowed_ip_list": ["10.0.0.0/8"], "blocked_ip_list": ["10.1.0.0/16"]}
+        monkeypatch.setattr(network_policy_check, "get_network_policy", lambda conn, name: policy)
+        
+        result = check_ip_against_policy(ip, "np", conn=object())
+        
+        assert result["status"] == status
+        assert result["allowed"] is (status == "ALLOWED")
+        assert result["in_allowed_list"] is (status == "ALLOWED")
+
+
+class FakeHTTPSConnection:
+    """Stand-in for http.client.HTTPSConnection with scripted responses."""
+    
+    instances = []
+    
+    def __init__(self, host, timeout=None):
+        self.host = host
+        self.requests = []
+        self.closed = 0
+        self.replies = []
+        FakeHTTPSConnection.instances.append(self)
+    
+    def request(self, method, path, headers=None):
+        self.requests.append(path)
+        reply = self.replies.pop(0) if self.replies else (200, b"198.51.100.7\n")
+        if isinstance(reply, Exception):
+            raise reply
+        self._reply = reply
+    
+    def getresponse(self):
+        status, body = self._reply
+        response = type("Response", (), {})()
+        response.status = status
+        response.read = lambda: body
+        return response
+    
+    def close(self):
+        self.closed += 1
+
+
+class TestPublicIpLookup:
+    """Tests for the keep-alive public IP lookup."""
+    
+    @pytest.fixture(autouse=True)
+    def fake_https(self, monkeypatch):
+        """Swap in FakeHTTPSConnection with an empty connection pool."""
+        FakeHTTPSConnection.instances = []
+        monkeypatch.setattr(http.client, "HTTPSConnection", FakeHTTPSConnection)
+        monkeypatch.setattr(network_policy_check, "_ip_lookup_connections", {})
+    
+    def test_connection_reused_across_lookups(self):
+        """Repeat lookups share one connection per host."""
+        assert get_public_ip() == "198.51.100.7"
+        assert get_public_ip() == "198.51.100.7"
+        
+        [conn] = FakeHTTPSConnection.instances
+        assert conn.host == "ifconfig.me"
+        assert conn.requests == ["/ip", "/ip"]
+    
+    def test_socket_error_closes_and_falls_back(self):
+        """A failed request closes the socket and the next service is tried."""
+        get_public_ip()
+        [conn] = FakeHTTPSConnection.instances
+        conn.replies = [ConnectionResetError("reset")]
+        
+        assert get_public_ip() == "198.51.100.7"
+        
+        assert conn.closed == 1
+        assert [c.host for c in FakeHTTPSConnection.instances] == ["ifconfig.me", "api.ipify.org"]
+        
+        # The closed connection is kept and reconnects on its next request
+        assert get_public_ip() == "198.51.100.7"
+        assert conn.requests == ["/ip", "/ip", "/ip"]
+    
+    def test_http_error_status_falls_back(self):
+        """Non-200 responses move on to the next service."""
+        network_policy_check._ip_lookup_connections["ifconfig.me"] = conn = FakeHTTPSConnection("ifconfig.me")
+        conn.replies = [(503, b"busy")]
+        
+        assert get_public_ip() == "198.51.100.7"
+    
+    def test_all_services_failing_raises(self):
+        """RuntimeError when no service answers."""
+        for host, _ in network_policy_check.IP_LOOKUP_SERVICES:
+            conn = FakeHTTPSConnection(host)
+            conn.replies = [OSError("unreachable")]
+            network_policy_check._ip_lookup_connections[host] = conn
+        
+        with pytest.raises(RuntimeError, match="Failed to get public IP"):
+            get_public_ip()
+
+
+class TestCheckConnectionConfig:
+    """Tests for check_connection_config."""
+    
+    @pytest.fixture
+    def toml_path(self, tmp_path, monkeypatch, no_snowflake_env):
+        """Point the config check at a temporary connections.toml."""
+        path = tmp_path / "connections.toml"
+        path.write_text('[prod]\naccount = "acct"\n')
+        monkeypatch.setattr(network_policy_check, "CONNECTIONS_TOML", path)
+        clear_connection_config_cache()
+        return path
+    
+    def test_reports_toml_and_env(self, toml_path, monkeypatch):
+        """Connection names and set variables are reported."""
+        monkeypatch.setenv("SNOWFLAKE_ACCOUNT", "org-acct")
+        
+        config = check_connection_config()
+        
+        assert config["has_toml"] is True
+        assert config["has_env"] is True
+        assert config["connections"] == ["prod"]
+        assert config["env_vars"] == {"SNOWFLAKE_ACCOUNT": "org-acct"}
+    
+    def test_mutating_result_does_not_poison_cache(self, toml_path):
+        """Each call returns its own copy of the memoized report."""
+        first = check_connection_config()
+        first["has_toml"] = False
+        first["connections"].append("injected")
+        first["env_vars"]["SNOWFLAKE_USER"] = "someone"
+        
+        second = check_connection_config()
+        
+        assert second["has_toml"] is True
+        assert second["connections"] == ["prod"]
+        assert second["env_vars"] == {}
+    
+    def test_clear_cache_forces_recheck(self, toml_path, monkeypatch):
+        """clear_connection_config_cache drops the memoized result."""
+        calls = []
+        original = network_policy_check._load_toml
+        monkeypatch.setattr(network_policy_check, "_load_toml", lambda *a: calls.append(a) or original(*a))
+        
+        check_connection_config()
+        check_connection_config()
+        assert len(calls) == 1
+        
+        clear_connection_config_cache()
+        check_connection_config()
+        assert len(calls) == 2
+
+
+class TestGetConnection:
+    """Tests for get_connection."""
+    
+    def test_name_missing_from_toml_is_left_to_connector(self, tmp_path, monkeypatch, no_snowflake_env):
+        """Names not in connections.toml still reach the connector, which resolves them."""
+        toml_path = tmp_path / "connections.toml"
+        toml_path.write_text('[default]\naccount = "acct"\n')
+        monkeypatch.setattr(network_policy_check, "CONNECTIONS_TOML", toml_path)
+        calls = []
+        monkeypatch.setattr(snowflake.connector, "connect", lambda **kwargs: calls.append(kwargs))
+        
+        get_connection("from_config_toml")
+        
+        assert calls == [{"connection_name": "from_config_toml"}]
+
+
+class TestPolicyCache:
+    """Tests for the opt-in on-disk policy cache."""
+    
+    POLICY = {"name": "np", "allowed_ip_list": ["10.0.0.0/8"], "blocked_ip_list": []}
+    
+    @pytest.fixture
+    def cache_dir(self, tmp_path, monkeypatch, no_snowflake_env):
+        """Point the policy cache at a temporary directory."""
+        monkeypatch.setattr(network_policy_check, "POLICY_CACHE_DIR", tmp_path / "cache")
+        return tmp_path / "cache"
+    
+    @pytest.fixture
+    def fetches(self, monkeypatch):
+        """Stub Snowflake: record each DESCRIBE and return POLICY."""
+        calls = []
+        
+        def fake_get_network_policy(conn, policy_name):
+            calls.append(policy_name)
+            return dict(self.POLICY)
+        
+        monkeypatch.setattr(network_policy_check, "get_network_policy", fake_get_network_policy)
+        return calls
+    
+    def test_fresh_entry_skips_snowflake(self, cache_dir, fetches):
+        """Within the TTL the second check is answered from the cache."""
+        first = check_ip_against_policy("10.1.2.3", "np", conn=object(), cache_ttl=60)
+        second = check_ip_against_policy("10.1.2.3", "np", conn=object(), cache_ttl=60)
+        
+        assert fetches == ["np"]
+        assert first["status"] == second["status"] == "ALLOWED"
+    
+    def test_expired_entry_is_refetched(self, cache_dir, fetches):
+        """Entries older than the TTL are ignored and rewritten."""
+        check_ip_against_policy("10.1.2.3", "np", conn=object(), cache_ttl=60)
+        path = _policy_cache_path("np")
+        old = time.time() - 120
+        os.utime(path, (old, old))
+        
+        check_ip_against_policy("10.1.2.3", "np", conn=object(), cache_ttl=60)
+        
+        assert fetches == ["np", "np"]
+        assert path.stat().st_mtime > old
+    
+    def test_zero_ttl_never_touches_disk(self, cache_dir, fetches):
+        """Without --cache-ttl nothing is read or written."""
+        check_ip_against_policy("10.1.2.3", "np", conn=object())
+        
+        assert not cache_dir.exists()
+    
+    def test_refresh_bypasses_fresh_entry(self, cache_dir, fetches):
+        """--no-cache (refresh_cache) refetches and updates a fresh entry."""
+        write_cached_policy(_policy_cache_path("np"), {"allowed_ip_list": [], "blocked_ip_list": []})
+        
+        result = check_ip_against_policy("10.1.2.3", "np", conn=object(), cache_ttl=60, refresh_cache=True)
+        
+        assert fetches == ["np"]
+        assert result["status"] == "ALLOWED"
+        assert read_cached_policy(_policy_cache_path("np"), 60) == self.POLICY
+    
+    @pytest.mark.parametrize("content", [b"{not json", b"\xff\xfe", b"[]"])
+    def test_corrupt_entry_is_refetched(self, cache_dir, fetches, content):
+        """Unparseable or non-object cache files count as misses."""
+        path = _policy_cache_path("np")
+        path.parent.mkdir(parents=True)
+        path.write_bytes(content)
+        
+        assert read_cached_policy(path, 60) is None
+        check_ip_against_policy("10.1.2.3", "np", conn=object(), cache_ttl=60)
+        
+        assert fetches == ["np"]
+        assert json.loads(path.read_text()) == self.POLICY
+    
+    def test_write_is_private_and_leaves_no_temp_files(self, cache_dir):
+        """Cache files are 0600 and written via rename, with no leftovers."""
+        path = _policy_cache_path("np")
+        write_cached_policy(path, self.POLICY)
+        
+        assert path.stat().st_mode & 0o777 == 0o600
+        assert list(cache_dir.iterdir()) == [path]
+    
+    def test_keys_isolated_by_connection_and_account(self, cache_dir, monkeypatch):
+        """Each connection/account gets its own entry for the same policy."""
+        paths = {
+            _policy_cache_path("np"),
+            _policy_cache_path("np", connection_name="prod"),
+            _policy_cache_path("np", connection_name="dev"),
+            _policy_cache_path("np", account="org-acct"),
+            _policy_cache_path("other", connection_name="prod"),
+        }
+        assert len(paths) == 5
+        
+        monkeypatch.setenv("SNOWFLAKE_ACCOUNT", "org-acct")
+        assert _policy_cache_path("np", connection_name="prod") == _policy_cache_path("np", account="org-acct")
+    
+    def test_entry_from_one_connection_not_served_to_another(self, cache_dir, fetches):
+        """A cached policy for 'prod' is not reused for 'dev'."""
+        check_ip_against_policy("10.1.2.3", "np", connection_name="prod", conn=object(), cache_ttl=60)
+        check_ip_against_policy("10.1.2.3", "np", connection_name="dev", conn=object(), cache_ttl=60)
+        
+        assert fetches == ["np", "np"]
+
+
+class TestCli:
+    """Tests for main() argument handling."""
+    
+    def test_check_config_skips_argparse(self, tmp_path, monkeypatch, capsys, no_snowflake_env):
+        """--check-config runs without a policy and without building a parser."""
+        monkeypatch.setattr(network_policy_check, "CONNECTIONS_TOML", tmp_path / "connections.toml")
+        monkeypatch.setattr(argparse, "ArgumentParser", None)
+        
+        with pytest.raises(SystemExit) as exc_info:
+            main(["--check-config", "--connection", "prod"])
+        
+        assert exc_info.value.code == 0
+        assert "Snowflake Connection Configuration" in capsys.readouterr().out
+    
+    def test_abbreviated_check_config_checks_config(self, tmp_path, monkeypatch, capsys, no_snowflake_env):
+        """An argparse abbreviation of --check-config still only checks config."""
+        monkeypatch.setattr(network_policy_check, "CONNECTIONS_TOML", tmp_path / "connections.toml")
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("policy should not be checked")
+        
+        monkeypatch.setattr(network_policy_check, "check_ip_against_policy", fail)
+        
+        with pytest.raises(SystemExit) as exc_info:
+            main(["--check", "-p", "np", "--ip", "1.2.3.4"])
+        
+        assert exc_info.value.code == 0
+        assert "Snowflake Connection Configuration" in capsys.readouterr().out
+    
+    def test_policy_name_required(self, capsys):
+        """Without --check-config, a missing -p is an argparse usage error."""
+        with pytest.raises(SystemExit) as exc_info:
+            main(["--ip", "1.2.3.4"])
+        
+        assert exc_info.value.code == 2
+        assert "--policy-name/-p" in capsys.readouterr().err
+    
+    def test_usage_shows_policy_name_required(self):
+        """-p is listed as required (not bracketed) in the usage line."""
+        usage = build_parser().format_usage()
+        assert "--policy-name POLICY_NAME" in usage
+        assert "[--policy-name" not in usage
+    
+    def test_help_with_check_config_prints_help(self, capsys):
+        """--help still wins when combined with --check-config."""
+        with pytest.raises(SystemExit) as exc_info:
+            main(["--check-config", "--help"])
+        
+        assert exc_info.value.code == 0
+        assert "--check-config" in capsys.readouterr().out